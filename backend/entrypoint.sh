@@ -1,8 +1,4 @@
 cd foodgram/
-python manage.py makemigrations --no-input
-python manage.py migrate --no-input
-python manage.py csv_data_load
-python manage.py collectstatic --no-input
-python manage.py create_default_su
+python manage.py bootstrap
 cp -r /app/foodgram/collected_static/. /backend_static/static/
-gunicorn foodgram.wsgi:application --bind 0.0.0.0:8000
+gunicorn foodgram.wsgi:application -c python:foodgram.gunicorn_config
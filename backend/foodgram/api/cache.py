@@ -0,0 +1,28 @@
+from django.core.cache import cache
+
+from foodgram.constants import RECIPE_FRAGMENT_TIMEOUT
+
+
+def recipe_fragment_key(recipe):
+    return f'recipe-fragment:{recipe.pk}:{recipe.version}'
+
+
+def get_recipe_fragments(recipes, build):
+    """Возвращает закэшированные части рецептов в порядке recipes.
+
+    Все фрагменты читаются одним get_many, а недостающие собираются
+    функцией build за один проход и сохраняются одним set_many.
+    Версия рецепта входит в ключ, поэтому инвалидация сводится к ее смене.
+    """
+    keys = [recipe_fragment_key(recipe) for recipe in recipes]
+    fragments = cache.get_many(keys)
+    missing = [(key, recipe) for key, recipe in zip(keys, recipes)
+               if key not in fragments]
+    if missing:
+        built = dict(zip(
+            (key for key, _ in missing),
+            build([recipe for _, recipe in missing]),
+        ))
+        cache.set_many(built, RECIPE_FRAGMENT_TIMEOUT)
+        fragments.update(built)
+    return [fragments[key] for key in keys]
@@ -15,7 +15,7 @@ class Base64ImageField(ImageField):
                 self.fail('invalid_image')
             try:
                 decoded_file = base64.b64decode(data)
-            except TypeError:
+            except (TypeError, ValueError):
                 self.fail('invalid_image')
 
             file_name = str(uuid.uuid4())[:12]
@@ -1,13 +1,13 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
-from recipes.models import Recipe, Tag
+from recipes import catalogue
+from recipes.models import Recipe
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name="tags__slug",
-        lookup_expr='icontains',
-        to_field_name='slug',
-        queryset=Tag.objects.all())
+    tags = filters.MultipleChoiceFilter(
+        choices=catalogue.tag_slug_choices,
+        method='filter_tags')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
@@ -22,6 +22,14 @@ class RecipeFilter(filters.FilterSet):
             'tags',
         }
 
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов, каждый рецепт один раз."""
+        tag_ids = catalogue.tag_ids_by_slug(value)
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(recipe_id=OuterRef('pk'),
+                                               tag_id__in=tag_ids)
+        ))
+
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favoriterecipe__user=self.request.user)
@@ -0,0 +1,57 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+from django.utils import timezone
+from recipes.models import Recipe
+from rest_framework.exceptions import ValidationError
+
+from foodgram.constants import RECIPE_IMAGE_WORKERS
+
+from .fields import Base64ImageField
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=RECIPE_IMAGE_WORKERS,
+                              thread_name_prefix='recipe-images')
+
+
+def save_recipe_images(images):
+    """Декодирует картинки из data URI и привязывает их к рецептам.
+
+    images — словарь id рецепта -> data URI. Рецепты с некорректной
+    картинкой остаются без нее и не мешают остальным.
+    """
+    field = Base64ImageField()
+    for recipe_id, data in images.items():
+        try:
+            image = field.to_internal_value(data)
+        except (ValidationError, ValueError):
+            logger.warning('Invalid image for imported recipe %s', recipe_id)
+            continue
+        recipe = Recipe(pk=recipe_id)
+        recipe.image.save(image.name, image, save=False)
+        # Новая версия сбрасывает закэшированный рецепт без картинки.
+        Recipe.objects.filter(pk=recipe_id).update(
+            image=recipe.image.name, version=uuid.uuid4(),
+            modified=timezone.now(),
+        )
+
+
+def save_recipe_images_in_worker(images):
+    try:
+        save_recipe_images(images)
+    except Exception:
+        logger.exception('Failed to save imported recipe images')
+    finally:
+        # Соединения потока пула не закрываются Django сами.
+        connections.close_all()
+
+
+def schedule_recipe_images(images):
+    """Сохраняет картинки в фоне после фиксации транзакции."""
+    if images:
+        transaction.on_commit(
+            lambda: executor.submit(save_recipe_images_in_worker, images)
+        )
@@ -0,0 +1,81 @@
+import shortuuid
+from django.db import transaction
+from recipes.models import IngredientPerRecipe, Recipe
+from rest_framework.exceptions import ParseError
+
+from foodgram.constants import RECIPE_IMPORT_CHUNK_SIZE
+
+from .images import schedule_recipe_images
+from .serializers import RecipeImportSerializer
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def import_recipes(author, payloads, chunk_size=RECIPE_IMPORT_CHUNK_SIZE):
+    """Создает рецепты автора пачками и возвращает результат по каждому.
+
+    Каждая пачка проверяется целиком и записывается в своей транзакции
+    тремя bulk_create: рецепты, теги и ингредиенты.
+    """
+    results = []
+    for chunk in chunked(list(enumerate(payloads)), chunk_size):
+        results += import_chunk(author, chunk)
+    return results
+
+
+def import_chunk(author, chunk):
+    results = {}
+    valid = []
+    names = {payload['name'] for _, payload in chunk
+             if isinstance(payload, dict)
+             and isinstance(payload.get('name'), str)}
+    taken = set(Recipe.objects.filter(author=author, name__in=names)
+                .values_list('name', flat=True))
+    for index, payload in chunk:
+        if isinstance(payload, ParseError):
+            errors = {'non_field_errors': [payload.detail]}
+        elif not isinstance(payload, dict):
+            errors = {'non_field_errors': ['Ожидается объект рецепта']}
+        else:
+            serializer = RecipeImportSerializer(data=payload)
+            errors = None if serializer.is_valid() else serializer.errors
+        if errors is None:
+            name = serializer.validated_data['name']
+            if name in taken:
+                errors = {'name': ['У вас уже есть рецепт с таким '
+                                   'названием']}
+            taken.add(name)
+        if errors is None:
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 400,
+                              'errors': errors}
+
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create([
+            Recipe(author=author, name=data['name'], text=data['text'],
+                   cooking_time=data['cooking_time'],
+                   short_link=shortuuid.ShortUUID().random())
+            for _, data in valid
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for recipe, (_, data) in zip(recipes, valid)
+            for tag_id in data['tags']
+        ])
+        IngredientPerRecipe.objects.bulk_create([
+            IngredientPerRecipe(recipe=recipe, ingredient_id=item['id'],
+                                amount=item['amount'])
+            for recipe, (_, data) in zip(recipes, valid)
+            for item in data['ingredients']
+        ])
+        schedule_recipe_images({
+            recipe.pk: data['image']
+            for recipe, (_, data) in zip(recipes, valid)
+        })
+    for recipe, (index, _) in zip(recipes, valid):
+        results[index] = {'index': index, 'status': 201, 'id': recipe.pk}
+    return [results[index] for index, _ in chunk]
@@ -1,6 +1,11 @@
-from django.db.models import Model, Q
+from hashlib import md5
+
+from django.db import transaction
+from django.db.models import Count, Max, Model, Q
 from django.db.utils import IntegrityError
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
                                    HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND)
@@ -14,7 +19,10 @@ class AddDeleteManyToManyRelationMixin:
     def _create_relation(self, obj_id):
         obj = get_object_or_404(self.queryset, pk=obj_id)
         try:
-            self.link_model(recipe=obj, user=self.request.user).save()
+            # Связь и зависящие от нее данные (например, итоги списка
+            # покупок) сохраняются вместе или не сохраняются вовсе.
+            with transaction.atomic():
+                self.link_model(recipe=obj, user=self.request.user).save()
         except IntegrityError:
             return Response(
                 {"error": "Действие выполнено ранее."},
@@ -25,11 +33,13 @@ class AddDeleteManyToManyRelationMixin:
 
     def _delete_relation(self, q: Q) -> Response:
         try:
-            deleted, _ = (
-                self.link_model.objects.filter(q & Q(user=self.request.user))
-                .first()
-                .delete()
-            )
+            with transaction.atomic():
+                deleted, _ = (
+                    self.link_model.objects
+                    .filter(q & Q(user=self.request.user))
+                    .first()
+                    .delete()
+                )
         except AttributeError:
             return Response(
                 {"error": "Объект не найден. "
@@ -43,3 +53,51 @@ class AddDeleteManyToManyRelationMixin:
             )
 
         return Response(status=HTTP_204_NO_CONTENT)
+
+
+class ConditionalGetMixin:
+    """Ответ 304 Not Modified без основного запроса и сериализации.
+
+    По умолчанию валидаторы строятся по времени последнего изменения
+    и числу строк таблицы, как для справочников тегов и ингредиентов.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validators(self, request):
+        """Возвращает (состояние для ETag, Last-Modified) или None."""
+        state = self.queryset.model.objects.aggregate(
+            modified=Max('modified'), count=Count('id')
+        )
+        return ((state['count'], state['modified'], request.get_full_path()),
+                state['modified'])
+
+    def conditional_response(self, request, respond, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return respond(request, *args, **kwargs)
+        state, last_modified = validators
+        etag = quote_etag(md5(repr(state).encode('utf-8')).hexdigest())
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = respond(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, super().list,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(request, super().retrieve,
+                                         *args, **kwargs)
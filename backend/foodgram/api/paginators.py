@@ -1,6 +1,205 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.constants import (COUNT_CACHE_TIMEOUT,
+                                COUNT_ESTIMATE_THRESHOLD)
+
+
+def estimate_count(queryset):
+    """Оценка числа строк планировщиком PostgreSQL или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с дешевым подсчетом объектов.
+
+    Точное число кэшируется на короткое время по тексту запроса
+    подсчета: в нем остаются только фильтры, а аннотации выборки
+    (например, флаги текущего пользователя) отбрасываются. Поэтому
+    одинаковые фильтры разных пользователей делят одну запись кэша.
+    Если планировщик оценивает выборку больше чем в
+    COUNT_ESTIMATE_THRESHOLD строк, вместо COUNT(*) отдается оценка.
+    """
+
+    count_is_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        counted = queryset.values('pk').order_by()
+        sql, params = counted.query.sql_with_params()
+        key = 'pagination-count:' + md5(
+            f'{sql}{params!r}'.encode('utf-8')
+        ).hexdigest()
+        cached = cache.get(key)
+        if cached is None:
+            estimate = estimate_count(counted)
+            if estimate is not None and estimate > COUNT_ESTIMATE_THRESHOLD:
+                cached = (estimate, False)
+            else:
+                cached = (super().count, True)
+            cache.set(key, cached, COUNT_CACHE_TIMEOUT)
+        count, self.count_is_exact = cached
+        return count
 
 
 class PageNumberLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
     page_size = 6
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        # Поле появляется только вместе с оценкой, точный ответ
+        # совпадает с описанным в документации API.
+        if not self.page.paginator.count_is_exact:
+            response.data['count_is_exact'] = False
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_exact'] = {
+            'type': 'boolean',
+            'description': 'Передается со значением false, если count '
+                           'является оценкой.',
+        }
+        return response_schema
+
+
+class RecipeCursorPagination(BasePagination):
+    """Курсорная навигация по рецептам в порядке (-pub_date, -id).
+
+    Страница выбирается условием по ключу последнего показанного рецепта,
+    поэтому не нужны ни OFFSET, ни COUNT(*), а новые рецепты не сдвигают
+    уже пролистанные страницы.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if position is None:
+            queryset = queryset.order_by('-pub_date', '-id')
+        else:
+            pub_date, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, id__gt=pk)
+                ).order_by('pub_date', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, id__lt=pk)
+                ).order_by('-pub_date', '-id')
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = urlsafe_b64decode(encoded.encode('ascii'))
+            direction, pub_date, pk = cursor.decode('ascii').split('|')
+            position = parse_datetime(pub_date), int(pk)
+        except (DecodeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None or direction not in ('n', 'p'):
+            raise NotFound(self.invalid_cursor_message)
+        return position, direction == 'p'
+
+    def encode_cursor(self, recipe, direction):
+        cursor = f'{direction}|{recipe.pub_date.isoformat()}|{recipe.pk}'
+        encoded = urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], 'n')
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return replace_query_param(self.base_url,
+                                       self.cursor_query_param, '')
+        return self.encode_cursor(self.page[0], 'p')
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class RecipePagination(PageNumberLimitPagination):
+    """Постраничная навигация, а при наличии ?cursor= — курсорная."""
+
+    cursor_pagination_class = RecipeCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request,
+                                                           view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
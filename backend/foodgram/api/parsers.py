@@ -0,0 +1,31 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Поток JSON-объектов, по одному на строку.
+
+    Возвращает генератор, поэтому тело запроса читается по мере
+    обработки. Вместо строк с некорректным JSON отдаются объекты
+    ParseError, чтобы ошибка касалась только своего элемента.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        return self.parse_lines(stream, encoding)
+
+    @staticmethod
+    def parse_lines(stream, encoding):
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line.decode(encoding))
+            except ValueError as error:
+                yield ParseError(f'Строка {number}: {error}')
@@ -0,0 +1,46 @@
+from users.models import Subscription
+
+
+class SubscriptionResolver:
+    """Подписки текущего пользователя в пределах одного запроса.
+
+    Сериализаторы списков заранее передают сюда id всех авторов страницы,
+    после чего флаг is_subscribed для каждого из них берется из памяти.
+    """
+
+    request_attr = '_subscription_resolver'
+
+    def __init__(self, user):
+        self.user = user
+        self._subscribed = {}
+
+    @classmethod
+    def for_request(cls, request):
+        resolver = getattr(request, cls.request_attr, None)
+        if resolver is None:
+            resolver = cls(request.user)
+            setattr(request, cls.request_attr, resolver)
+        return resolver
+
+    def prime(self, author_ids):
+        """Загружает подписки на переданных авторов одним запросом."""
+        if not self.user.is_authenticated:
+            return
+        missing = set(author_ids) - self._subscribed.keys()
+        missing.discard(None)
+        if not missing:
+            return
+        followed = set(
+            Subscription.objects.filter(
+                user=self.user, target_user_id__in=missing
+            ).values_list('target_user_id', flat=True)
+        )
+        for author_id in missing:
+            self._subscribed[author_id] = author_id in followed
+
+    def is_subscribed(self, author):
+        if not self.user.is_authenticated or self.user.pk == author.pk:
+            return False
+        if author.pk not in self._subscribed:
+            self.prime([author.pk])
+        return self._subscribed[author.pk]
@@ -1,19 +1,74 @@
+import base64
+import binascii
+from operator import attrgetter
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxLengthValidator
+from django.db import transaction
+from django.db.models import Manager, prefetch_related_objects
 from djoser import serializers as djoser_serialisers
+from recipes import catalogue, shopping_list
 from recipes.models import Ingredient, IngredientPerRecipe, Recipe, Tag
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 from users.models import Subscription
 from users.validators import CantSubscribeMyselfValdiator, username_validator
 
-from foodgram.constants import MAX_USERNAME_LENGTH
+from foodgram.constants import (MAX_INGREDIENT_AMOUNT, MAX_USERNAME_LENGTH,
+                                MIN_INGREDIENT_AMOUNT)
 
+from .cache import get_recipe_fragments
 from .fields import Base64ImageField
+from .resolvers import SubscriptionResolver
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Значение ?recipes_limit= или None, если параметр не передан."""
+    limit = request.query_params.get('recipes_limit')
+    if limit in (None, ''):
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise serializers.ValidationError(
+            {'recipes_limit': 'Ожидается целое неотрицательное число.'}
+        )
+    return limit
+
+
+class SubscriptionPrimingListSerializer(serializers.ListSerializer):
+    """Список, заранее загружающий подписки на всех авторов страницы."""
+
+    author_id_attr = 'pk'
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        self.prime_subscriptions(items)
+        return super().to_representation(items)
+
+    def prime_subscriptions(self, items):
+        request = self.context.get('request')
+        if request is not None:
+            SubscriptionResolver.for_request(request).prime(
+                getattr(item, self.author_id_attr) for item in items
+            )
+
+
+class RecipeListSerializer(SubscriptionPrimingListSerializer):
+    author_id_attr = 'author_id'
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        self.prime_subscriptions(recipes)
+        fragments = get_recipe_fragments(recipes, build_recipe_fragments)
+        return [self.child.personalize(recipe, fragment)
+                for recipe, fragment in zip(recipes, fragments)]
+
+
 class CustomUserSerializer(serializers.ModelSerializer,
                            djoser_serialisers.UserCreateMixin):
 
@@ -44,19 +99,11 @@ class CustomUserSerializer(serializers.ModelSerializer,
             "password",
         )
         read_only_fields = ["id", ]
+        list_serializer_class = SubscriptionPrimingListSerializer
 
     def get_is_subscribed(self, obj):
-        if not self.context['request'].user.is_authenticated:
-            return False
-        request_user = self.context['request'].user
-        if request_user == obj:
-            return False
-        else:
-            subscribed = Subscription.objects.filter(user=request_user,
-                                                     target_user=obj)
-            if subscribed:
-                return True
-        return False
+        resolver = SubscriptionResolver.for_request(self.context['request'])
+        return resolver.is_subscribed(obj)
 
 
 class AvatarSerializer(serializers.Serializer):
@@ -97,6 +144,83 @@ class IngredientPerRecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'measurement_unit', 'amount', ]
 
 
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Строка списка покупок из create_ingredients_list."""
+
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField()
+    amount = serializers.IntegerField(source='total_amount')
+
+
+class AuthorCardSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = User
+        fields = (
+            "id",
+            "username",
+            "first_name",
+            "last_name",
+            "email",
+            "avatar",
+        )
+
+
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    """Часть рецепта, не зависящая от пользователя. Хранится в кэше."""
+
+    tags = TagSerializer(source='catalogue_tags', many=True)
+    ingredients = IngredientPerRecipeSerializer(source='ingredient_recipes',
+                                                many=True)
+    author = AuthorCardSerializer()
+    image = serializers.ImageField()
+
+    class Meta:
+        model = Recipe
+        fields = ['id',
+                  'tags',
+                  'author',
+                  'ingredients',
+                  'name',
+                  'image',
+                  'text',
+                  'cooking_time'
+                  ]
+
+
+def build_recipe_fragments(recipes):
+    """Сериализует рецепты, беря теги и ингредиенты из справочников.
+
+    Из базы читаются только связи рецептов с тегами и ингредиентами,
+    сами объекты подставляются из recipes.catalogue.
+    """
+    recipe_ids = [recipe.pk for recipe in recipes]
+    tag_links = list(
+        Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        .values_list('recipe_id', 'tag_id')
+    )
+    tags = catalogue.tags.resolve(tag_id for _, tag_id in tag_links)
+    recipe_tags = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, tag_id in tag_links:
+        recipe_tags[recipe_id].append(tags[tag_id])
+    prefetch_related_objects(recipes, 'ingredient_recipes')
+    ingredients = catalogue.ingredients.resolve(
+        row.ingredient_id
+        for recipe in recipes for row in recipe.ingredient_recipes.all()
+    )
+    for recipe in recipes:
+        recipe.catalogue_tags = sorted(recipe_tags[recipe.pk],
+                                       key=attrgetter('name'))
+        for row in recipe.ingredient_recipes.all():
+            row.ingredient = ingredients[row.ingredient_id]
+    return RecipeFragmentSerializer(recipes, many=True).data
+
+
+def absolute_url(request, url):
+    return request.build_absolute_uri(url) if url else url
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     ingredients = IngredientPerRecipeSerializer(source='ingredient_recipes',
@@ -120,43 +244,28 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'text',
                   'cooking_time'
                   ]
+        list_serializer_class = RecipeListSerializer
 
     def validate(self, data):
         tags = self.initial_data.get("tags")
-        tag_ids_list = []
         if not tags:
             raise serializers.ValidationError(
                 {'tags': 'Должен быть хотя бы один тег'}
             )
-        for tag_id in tags:
-            tag = Tag.objects.filter(id=tag_id)
-            if not tag.exists():
-                raise serializers.ValidationError({
-                    'tags': 'Указан не существующий тег'})
-            if tag_id in tag_ids_list:
-                raise serializers.ValidationError('Теги не должны повторяться')
-            tag_ids_list.append(tag_id)
         ingredients = self.initial_data.get("ingredients")
         if not ingredients:
             raise serializers.ValidationError({
                 'ingredients':
                 'Нужно добавить хотя бы один ингридиент для рецепта'})
-        ingredient_ids_list = []
-        for ingredient_item in ingredients:
-            ingredient = Ingredient.objects.filter(id=ingredient_item['id'])
-            if not ingredient.exists():
-                raise serializers.ValidationError({
-                    'ingredients':
-                    'Указан не существующий ингридиент'})
-            if ingredient_item['id'] in ingredient_ids_list:
-                raise serializers.ValidationError('Ингридиенты должны '
-                                                  'быть уникальными')
-            ingredient_ids_list.append(ingredient_item['id'])
-            if int(ingredient_item['amount']) <= 0:
-                raise serializers.ValidationError({
-                    'ingredients': ('Убедитесь, что значение количества '
-                                    'ингредиента в рецепте больше 0')
-                })
+        tags, tag_errors = self.check_tags(tags)
+        ingredients, ingredient_errors = self.check_ingredients(ingredients)
+        errors = {}
+        if tag_errors:
+            errors['tags'] = tag_errors
+        if ingredient_errors:
+            errors['ingredients'] = ingredient_errors
+        if errors:
+            raise serializers.ValidationError(errors)
         author = self.context["request"].user
         data.update(
             {
@@ -167,11 +276,117 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         return data
 
+    @staticmethod
+    def check_tags(tags):
+        """Id тегов и ошибки по позициям списка, как у ListField.
+
+        Все теги проверяются по справочнику в памяти за один проход.
+        """
+        if not isinstance(tags, list):
+            return [], ['Ожидается список id тегов']
+        tag_ids = []
+        errors = {}
+        for position, tag_id in enumerate(tags):
+            try:
+                tag_ids.append(int(tag_id))
+            except (TypeError, ValueError):
+                tag_ids.append(None)
+                errors[position] = ['Id тега должен быть числом']
+        existing = catalogue.tags.resolve(
+            tag_id for tag_id in tag_ids if tag_id is not None
+        )
+        seen = set()
+        for position, tag_id in enumerate(tag_ids):
+            if tag_id is None:
+                continue
+            if tag_id not in existing:
+                errors[position] = ['Указан не существующий тег']
+            elif tag_id in seen:
+                errors[position] = ['Теги не должны повторяться']
+            seen.add(tag_id)
+        return tag_ids, errors
+
+    @staticmethod
+    def check_ingredients(ingredients):
+        """Ингредиенты и ошибки по позициям списка, как у ListSerializer.
+
+        Ошибки возвращаются списком той же длины, что и ингредиенты:
+        для верных элементов в нем пустые словари.
+        """
+        if not isinstance(ingredients, list):
+            return [], ['Ожидается список ингредиентов']
+        items = []
+        errors = [{} for _ in ingredients]
+        for position, item in enumerate(ingredients):
+            if not isinstance(item, dict):
+                errors[position] = {'non_field_errors': [
+                    'Ожидается объект с полями id и amount']}
+                items.append(None)
+                continue
+            ingredient_id = amount = None
+            try:
+                ingredient_id = int(item.get('id'))
+            except (TypeError, ValueError):
+                errors[position]['id'] = ['Id ингредиента должен быть числом']
+            try:
+                amount = int(item.get('amount'))
+            except (TypeError, ValueError):
+                errors[position]['amount'] = ['Количество должно быть числом']
+            if amount is not None and not (
+                MIN_INGREDIENT_AMOUNT <= amount <= MAX_INGREDIENT_AMOUNT
+            ):
+                errors[position]['amount'] = [
+                    'Убедитесь, что значение количества ингредиента '
+                    f'в рецепте от {MIN_INGREDIENT_AMOUNT} '
+                    f'до {MAX_INGREDIENT_AMOUNT}'
+                ]
+            items.append({'id': ingredient_id, 'amount': amount})
+        existing = catalogue.ingredients.resolve(
+            item['id'] for item in items
+            if item is not None and item['id'] is not None
+        )
+        seen = set()
+        for position, item in enumerate(items):
+            if item is None or item['id'] is None:
+                continue
+            if item['id'] not in existing:
+                errors[position]['id'] = ['Указан не существующий ингридиент']
+            elif item['id'] in seen:
+                errors[position]['id'] = ['Ингридиенты должны быть '
+                                          'уникальными']
+            seen.add(item['id'])
+        if not any(errors):
+            errors = []
+        return items, errors
+
+    def to_representation(self, instance):
+        fragment, = get_recipe_fragments([instance], build_recipe_fragments)
+        return self.personalize(instance, fragment)
+
+    def personalize(self, recipe, fragment):
+        """Дополняет кэшированную часть рецепта данными пользователя."""
+        request = self.context['request']
+        resolver = SubscriptionResolver.for_request(request)
+        author = dict(fragment['author'])
+        author['is_subscribed'] = resolver.is_subscribed(recipe.author)
+        author['avatar'] = absolute_url(request, author['avatar'])
+        data = {
+            **fragment,
+            'author': author,
+            'image': absolute_url(request, fragment['image']),
+            'is_favorited': self.get_is_favorited(recipe),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(recipe),
+        }
+        return {field: data[field] for field in self.Meta.fields}
+
     def get_is_favorited(self, recipe: Recipe):
         user = self.context['request'].user
 
         if not user.is_authenticated:
             return False
+        # Флаг уже посчитан подзапросом в RecipeViewSet.get_queryset.
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         in_favourite = user.favoriterecipe_set.filter(recipe=recipe).exists()
         return in_favourite
 
@@ -179,48 +394,130 @@ class RecipeSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         shopping_cart = user.shopingcart_set.filter(recipe=recipe)
         is_in_shopping_cart = shopping_cart.exists()
         return is_in_shopping_cart
 
+    @transaction.atomic
     def create(self, validated_data):
-        tags_data = validated_data.pop('tags')
-        ingredients_data = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        for tag in tags_data:
-            recipe.tags.add(tag)
-        for ingredient_item in ingredients_data:
-            ingredient, amount = ingredient_item.values()
-            recipe.ingredients.add(
-                ingredient,
-                through_defaults={'amount': amount}
-            )
+        self.set_tags(recipe, tags, created=True)
+        self.set_ingredients(recipe, ingredients, created=True)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
         for attr, value in validated_data.items():
-            if attr == 'tags':
-                instance.tags.set(value)
-            elif attr == 'ingredients':
-                instance.ingredients.clear()
-                objs = []
-                for ingredient_data in value:
-                    ingredient_id, amount = ingredient_data.values()
-                    ingredient_instance = Ingredient.objects.get(
-                        id=ingredient_id
-                    )
-                    objs.append(
-                        IngredientPerRecipe(
-                            recipe=instance,
-                            ingredient=ingredient_instance,
-                            amount=amount
-                        ))
-                IngredientPerRecipe.objects.bulk_create(objs)
-            else:
-                setattr(instance, attr, value)
+            setattr(instance, attr, value)
+        if tags is not None:
+            self.set_tags(instance, tags)
+        if ingredients is not None:
+            self.set_ingredients(instance, ingredients)
+        # Сохранение меняет версию рецепта и сбрасывает его кэш.
         instance.save()
         return instance
 
+    @staticmethod
+    def set_tags(recipe, tag_ids, created=False):
+        """Меняет только те связи с тегами, которые отличаются."""
+        links = Recipe.tags.through.objects.filter(recipe=recipe)
+        current = (set() if created
+                   else set(links.values_list('tag_id', flat=True)))
+        removed = current - set(tag_ids)
+        if removed:
+            links.filter(tag_id__in=removed).delete()
+        Recipe.tags.through.objects.bulk_create(
+            [Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+             for tag_id in tag_ids if tag_id not in current]
+        )
+
+    @staticmethod
+    def set_ingredients(recipe, ingredients, created=False):
+        """Удаляет, обновляет и добавляет только изменившиеся строки."""
+        current = {} if created else {
+            row.ingredient_id: row
+            for row in IngredientPerRecipe.objects.filter(recipe=recipe)
+        }
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        kept = {pk: row.amount for pk, row in current.items()
+                if pk in amounts}
+        removed = current.keys() - amounts.keys()
+        if removed:
+            # Списки покупок поправляет сигнал удаления строки.
+            IngredientPerRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientPerRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientPerRecipe.objects.bulk_create(
+            [IngredientPerRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                                 amount=amount)
+             for ingredient_id, amount in amounts.items()
+             if ingredient_id not in current]
+        )
+        if current:
+            # bulk_update и bulk_create не отправляют сигналы, поэтому
+            # их разница учитывается здесь. Новый рецепт еще не лежит
+            # ни в одной корзине.
+            shopping_list.recipe_changed(
+                recipe.pk, shopping_list.amount_deltas(kept, amounts))
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Элемент пакетного импорта рецептов.
+
+    Картинка проверяется по заголовку data URI и корректности base64:
+    как изображение она разбирается и сохраняется уже после ответа,
+    см. api.images.
+    """
+
+    image = serializers.RegexField(r'^data:image/[\w.+-]+;base64,')
+
+    class Meta:
+        model = Recipe
+        fields = ('name', 'image', 'text', 'cooking_time')
+        # Уникальность названия проверяется сразу для всего пакета.
+        validators = ()
+
+    def validate_image(self, value):
+        try:
+            base64.b64decode(value.split(';base64,', 1)[1], validate=True)
+        except binascii.Error:
+            raise serializers.ValidationError(
+                'Картинка должна быть закодирована в base64')
+        return value
+
+    def validate(self, data):
+        errors = {}
+        tags, errors['tags'] = RecipeSerializer.check_tags(
+            self.initial_data.get('tags') or [])
+        ingredients, errors['ingredients'] = (
+            RecipeSerializer.check_ingredients(
+                self.initial_data.get('ingredients') or [])
+        )
+        if not tags:
+            errors['tags'] = ['Должен быть хотя бы один тег']
+        if not ingredients:
+            errors['ingredients'] = [
+                'Нужно добавить хотя бы один ингридиент для рецепта']
+        errors = {field: error for field, error in errors.items() if error}
+        if errors:
+            raise serializers.ValidationError(errors)
+        data.update(tags=tags, ingredients=ingredients)
+        return data
+
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -278,28 +575,23 @@ class UserRecipesSerializer(serializers.ModelSerializer):
             "recipes_count",
             "recipes"
         )
+        list_serializer_class = SubscriptionPrimingListSerializer
 
     def get_is_subscribed(self, obj):
-        if not self.context['request'].user.is_authenticated:
-            return False
-        request_user = self.context['request'].user
-        if request_user == obj:
-            return False
-        else:
-            subscribed = Subscription.objects.filter(user=request_user,
-                                                     target_user=obj)
-            if subscribed:
-                return True
-        return False
+        resolver = SubscriptionResolver.for_request(self.context['request'])
+        return resolver.is_subscribed(obj)
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         recipes_count = obj.recipes.count()
         return recipes_count
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
+        if hasattr(obj, 'recent_recipes'):
+            return RecipeShortSerializer(obj.recent_recipes, many=True).data
+        limit = get_recipes_limit(self.context.get('request'))
         queryset = Recipe.objects.filter(author=obj.id)
-        if limit:
-            queryset = queryset[:int(limit)]
+        if limit is not None:
+            queryset = queryset[:limit]
         return RecipeShortSerializer(queryset, many=True).data
@@ -1,51 +1,105 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from recipes.models import IngredientPerRecipe
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 import os
+from functools import cache
+from tempfile import SpooledTemporaryFile
+
 from django.conf import settings
+from django.db.models import F
+from django.http import FileResponse
+from recipes.models import ShoppingListItem
 
+FONT_NAME = 'Lato-Regular'
+PDF_CHUNK_SIZE = 64 * 1024
+# Разметка страницы A4 (595 x 842 пт).
+TITLE_Y = 800
+TOP_Y = 750
+BOTTOM_Y = 60
+LINE_HEIGHT = 25
 
-def create_ingredients_list(request):
-    final_list = {}
-    ingredients = IngredientPerRecipe.objects.filter(
-        recipe__in_cart__user=request.user).annotate(
-            total_amount=Sum("amount")).order_by('recipe__name').values_list(
-            'ingredient__name', 'ingredient__measurement_unit',
-            'amount')
-    for item in ingredients:
-        name = item[0]
-        final_list[name] = {
-            'measurement_unit': item[1],
-            'total_amount': item[2]
-        }
-    return final_list
 
+def create_ingredients_list(user):
+    """Суммарное количество каждого ингредиента из корзины пользователя.
+
+    Итоги хранятся готовыми в ShoppingListItem и обновляются при
+    изменении корзины, поэтому чтение не зависит от числа рецептов в ней.
+    Одноименные ингредиенты с разными единицами не смешиваются.
+    """
+    return list(
+        ShoppingListItem.objects
+        .filter(user=user)
+        .values('ingredient_id', 'total_amount',
+                name=F('ingredient__name'),
+                measurement_unit=F('ingredient__measurement_unit'))
+        .order_by('name', 'measurement_unit', 'ingredient_id')
+    )
+
+
+@cache
+def register_font():
+    """Разбирает TTF-шрифт один раз на процесс.
+
+    reportlab встраивает в документ только подмножество глифов,
+    использованных в тексте, поэтому файл остается небольшим.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
 
-def make_pdf_file_of_ingredients(final_list):
-    # Check for the correct font path in production
     font_path = os.path.join(settings.BASE_DIR, 'Lato-Regular.ttf')
+    pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+    return FONT_NAME
 
-    pdfmetrics.registerFont(TTFont('Lato-Regular', font_path))
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = ('attachment; '
-                                       'filename="shopping_list.pdf"')
-    page = canvas.Canvas(response)
-    page.setFont('Lato-Regular', size=18)
-    page.drawString(200, 800, 'Список ингредиентов')
+def draw_ingredients_pdf(final_list, file):
+    """Рисует список покупок, перенося строки на новые страницы."""
+    # reportlab и Pillow импортируются при первой выгрузке списка,
+    # а не при старте каждого воркера.
+    from reportlab.pdfgen import canvas
 
-    page.setFont('Lato-Regular', size=16)
-    height = 750
-    for i, (name, data) in enumerate(final_list.items(), 1):
+    font = register_font()
+    page = canvas.Canvas(file)
+    page.setFont(font, size=18)
+    page.drawString(200, TITLE_Y, 'Список ингредиентов')
+    height = TOP_Y
+    for i, item in enumerate(final_list, 1):
+        if height < BOTTOM_Y:
+            finish_page(page, font)
+            height = TITLE_Y
+        page.setFont(font, size=16)
         page.drawString(75, height,
-                        f'{i}.  {name} - {data["total_amount"]}, '
-                        f'{data["measurement_unit"]}')
-        height -= 25
+                        f'{i}.  {item["name"]} - {item["total_amount"]}, '
+                        f'{item["measurement_unit"]}')
+        height -= LINE_HEIGHT
+    finish_page(page, font)
+    page.save()
 
+
+def finish_page(page, font):
+    page.setFont(font, size=10)
+    page.drawRightString(520, BOTTOM_Y - 30, str(page.getPageNumber()))
     page.showPage()
-    page.save()
 
+
+def render_ingredients_pdf(final_list):
+    """Готовый PDF во временном файле, открытом на начале.
+
+    Большой документ уходит на диск, а не держится в памяти. Документ
+    рисуется до ответа: ошибка отрисовки дает 500, а не обрезанный
+    файл со статусом 200.
+    """
+    file = SpooledTemporaryFile(max_size=PDF_CHUNK_SIZE * 16)
+    try:
+        draw_ingredients_pdf(final_list, file)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
+def make_pdf_file_of_ingredients(final_list):
+    response = FileResponse(render_ingredients_pdf(final_list),
+                            as_attachment=True,
+                            filename='shopping_list.pdf',
+                            content_type='application/pdf')
+    # Готовый файл отдается клиенту частями.
+    response.block_size = PDF_CHUNK_SIZE
     return response
@@ -1,25 +1,39 @@
+from itertools import islice
+from types import GeneratorType
+
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from django.http import JsonResponse
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
+from django.http import FileResponse, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser import views as djoser_views
+from recipes import autocomplete, snapshots
 from recipes.models import FavoriteRecipe, Ingredient, Recipe, ShopingCart, Tag
 from rest_framework import filters as drf_filters
+from rest_framework import mixins as drf_mixins
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from users.models import Subscription
 
+from foodgram.constants import AUTOCOMPLETE_MAX_LIMIT, RECIPE_IMPORT_MAX_ITEMS
+
 from . import permissions as custom_permissions
 from .filters import RecipeFilter
-from .mixins import AddDeleteManyToManyRelationMixin
-from .paginators import PageNumberLimitPagination
+from .importers import import_recipes
+from .mixins import AddDeleteManyToManyRelationMixin, ConditionalGetMixin
+from .paginators import (PageNumberLimitPagination, RecipeCursorPagination,
+                         RecipePagination)
+from .parsers import NDJSONParser
 from .serializers import (AvatarResponseSerializer, AvatarSerializer,
                           CustomUserSerializer, IngredientSerializer,
                           RecipeSerializer, RecipeShortSerializer,
-                          SubscriptionSerializer, TagSerializer,
-                          UserRecipesSerializer)
+                          ShoppingListItemSerializer, SubscriptionSerializer,
+                          TagSerializer, UserRecipesSerializer,
+                          get_recipes_limit)
 from .utils import create_ingredients_list, make_pdf_file_of_ingredients
 
 User = get_user_model()
@@ -28,7 +42,7 @@ User = get_user_model()
 class CustomUserViewSet(djoser_views.UserViewSet,
                         AddDeleteManyToManyRelationMixin):
 
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = PageNumberLimitPagination
@@ -44,6 +58,8 @@ class CustomUserViewSet(djoser_views.UserViewSet,
         if request.method == 'DELETE':
             self.link_model = Subscription
             return self._delete_relation(Q(target_user__id=self.kwargs['id']))
+        # Параметр проверяется до создания подписки, а не при выводе ответа.
+        get_recipes_limit(request)
         request.data['user'] = request.user.id
         if not User.objects.filter(id=self.kwargs['id']).exists():
             return Response(data={
@@ -70,6 +86,11 @@ class CustomUserViewSet(djoser_views.UserViewSet,
     def recepies(self, request, id):
         user = self.get_object()
         related_recipes = Recipe.objects.filter(author=user)
+        if RecipeCursorPagination.cursor_query_param in request.query_params:
+            paginator = RecipeCursorPagination()
+            page = paginator.paginate_queryset(related_recipes, request, self)
+            serializer = RecipeShortSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         serializer = RecipeShortSerializer(related_recipes, many=True)
         if serializer.is_valid:
             return Response(serializer.data)
@@ -78,14 +99,25 @@ class CustomUserViewSet(djoser_views.UserViewSet,
     @action(methods=['get'], detail=False,
             permission_classes=[permissions.IsAuthenticated, ])
     def subscriptions(self, request):
+        # Ответ постраничный ({count, next, previous, results}),
+        # как описано в docs/openapi-schema.yml, а не простой список.
         user = self.request.user
-        subscribed_users = User.objects.filter(subscribers__user=user)
-        serializer = UserRecipesSerializer(subscribed_users,
+        recipes = Recipe.objects.all()
+        limit = get_recipes_limit(request)
+        if limit is not None:
+            recipes = recipes[:limit]
+        subscribed_users = User.objects.filter(
+            subscribers__user=user
+        ).annotate(
+            recipes_count=Count('recipes', distinct=True)
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recent_recipes')
+        ).order_by('id')
+        page = self.paginate_queryset(subscribed_users)
+        serializer = UserRecipesSerializer(page,
                                            context={"request": request},
                                            many=True)
-        if serializer.is_valid:
-            return Response(serializer.data)
-        return Response(serializer.errors)
+        return self.get_paginated_response(serializer.data)
 
     @action(methods=['put', 'delete'], detail=False,
             permission_classes=[permissions.IsAuthenticated, ],
@@ -108,14 +140,14 @@ class CustomUserViewSet(djoser_views.UserViewSet,
             )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -123,16 +155,130 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('^name',)
     pagination_class = None
 
+    def get_validators(self, request):
+        state, last_modified = super().get_validators(request)
+        self.catalogue_state = state[:2]
+        search_param = drf_filters.SearchFilter.search_param
+        if search_param not in request.query_params:
+            # Снимок отдается сжатым по-разному, а сильный ETag
+            # должен различаться для каждого Content-Encoding.
+            state += (snapshots.accepted_encodings(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')),)
+        return state, last_modified
+
+    def list(self, request, *args, **kwargs):
+        search_param = drf_filters.SearchFilter.search_param
+        if search_param in request.query_params:
+            return self.conditional_response(request, self.autocomplete)
+        return self.conditional_response(request, self.snapshot,
+                                         *args, **kwargs)
+
+    def snapshot(self, request, *args, **kwargs):
+        """Весь справочник из готового сжатого снимка, без сериализации.
+
+        Если снимка нет или он не совпадает с таблицей, список строится
+        как обычно.
+        """
+        pointer = snapshots.current_ingredients_snapshot()
+        count, modified = self.catalogue_state
+        state = (count, modified and modified.isoformat())
+        file = None
+        if pointer and (pointer['count'], pointer['modified']) == state:
+            file, encoding = snapshots.open_snapshot(
+                pointer, request.META.get('HTTP_ACCEPT_ENCODING', '')
+            )
+        if file is None:
+            return drf_mixins.ListModelMixin.list(self, request,
+                                                  *args, **kwargs)
+        response = FileResponse(file, content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        url = request.build_absolute_uri(
+            snapshots.snapshot_url(pointer['filename'])
+        )
+        response['Link'] = f'<{url}>; rel="alternate"; type="application/json"'
+        response['X-Catalogue-Version'] = pointer['version']
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def autocomplete(self, request):
+        """Подсказки по началу названия или, с ?fuzzy=1, по сходству."""
+        prefix = request.query_params[drf_filters.SearchFilter.search_param]
+        # Без ?limit= возвращаются все совпадения, как и до подсказок:
+        # ограничение действует, только если клиент его запросил.
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = None
+        if limit is not None and limit <= 0:
+            limit = None
+        if limit is not None:
+            limit = min(limit, AUTOCOMPLETE_MAX_LIMIT)
+        if request.query_params.get('fuzzy') in ('1', 'true'):
+            ingredients = autocomplete.fuzzy_search(prefix, limit)
+        else:
+            ingredients = autocomplete.ingredients.search(prefix, limit)
+        return Response(self.get_serializer(ingredients, many=True).data)
+
 
-class RecipeViewSet(viewsets.ModelViewSet,
+class RecipeViewSet(ConditionalGetMixin,
+                    viewsets.ModelViewSet,
                     AddDeleteManyToManyRelationMixin):
 
     permission_classes = [custom_permissions.IsAuthorOrIsStaffOrReadOnly, ]
     serializer_class = RecipeSerializer
+    # Теги и ингредиенты подгружаются только для рецептов,
+    # которых нет в кэше (см. build_recipe_fragments).
     queryset = Recipe.objects.select_related("author")
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = PageNumberLimitPagination
+    pagination_class = RecipePagination
+    conditional_actions = ('retrieve',)
+
+    def get_validators(self, request):
+        """Версия рецепта и флаги пользователя, которые видны в ответе."""
+        user = request.user
+        fields = ['version', 'modified']
+        queryset = self.get_queryset()
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                author_followed=Exists(Subscription.objects.filter(
+                    user=user, target_user=OuterRef('author')))
+            )
+            fields += ['is_favorited', 'is_in_shopping_cart',
+                       'author_followed']
+        try:
+            state = queryset.filter(
+                pk=self.kwargs['pk']).values_list(*fields).first()
+        except (TypeError, ValueError):
+            return None
+        if state is None:
+            return None
+        # Флаги пользователя меняются без изменения рецепта, поэтому
+        # If-Modified-Since допустим только для анонимных запросов.
+        last_modified = None if user.is_authenticated else state[1]
+        return (user.pk, state), last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        patch_vary_headers(response, ('Authorization',))
+        if request.user.is_authenticated:
+            # Флаги и ETag ответа зависят от пользователя: общие кэши
+            # не должны отдавать его другим клиентам.
+            patch_cache_control(response, private=True)
+        return response
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShopingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -166,12 +312,42 @@ class RecipeViewSet(viewsets.ModelViewSet,
         self.link_model = ShopingCart
         return self._delete_relation(Q(recipe_id=pk))
 
+    @action(detail=False, methods=['post'],
+            permission_classes=[permissions.IsAuthenticated],
+            parser_classes=[JSONParser, NDJSONParser])
+    def batch(self, request):
+        """Импорт массива или NDJSON-потока рецептов текущего автора."""
+        payloads = request.data
+        # JSON-массив или генератор NDJSONParser; объект, строка,
+        # число, true или null — ошибка всего запроса.
+        if not isinstance(payloads, (list, GeneratorType)):
+            raise ParseError('Ожидается массив рецептов')
+        payloads = list(islice(payloads, RECIPE_IMPORT_MAX_ITEMS + 1))
+        if len(payloads) > RECIPE_IMPORT_MAX_ITEMS:
+            raise ParseError(
+                f'Не больше {RECIPE_IMPORT_MAX_ITEMS} рецептов за запрос'
+            )
+        results = import_recipes(request.user, payloads)
+        return Response({
+            'created': sum(result['status'] == 201 for result in results),
+            'failed': sum(result['status'] != 201 for result in results),
+            'results': results,
+        })
+
     @action(detail=False, methods=['get'],
             permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
-        final_list = create_ingredients_list(request)
+        final_list = create_ingredients_list(request.user)
         return make_pdf_file_of_ingredients(final_list)
 
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.IsAuthenticated])
+    def shopping_list(self, request):
+        """Список покупок в JSON, те же строки, что и в PDF."""
+        serializer = ShoppingListItemSerializer(
+            create_ingredients_list(request.user), many=True)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['get'],
             url_path='get-link'
             )
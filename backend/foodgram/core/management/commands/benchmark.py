@@ -0,0 +1,344 @@
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+COLLECTION_PATH = os.path.join(
+    settings.BASE_DIR,
+    '../../postman_collection/foodgram.postman_collection.json',
+)
+
+PostmanRequest = namedtuple(
+    'PostmanRequest', ('folders', 'name', 'method', 'url', 'body', 'auth')
+)
+Scenario = namedtuple('Scenario', ('name', 'weight', 'matches'))
+
+VARIABLE = re.compile(r'{{(\w+)}}')
+
+# Сценарии собираются из запросов коллекции по папкам Postman.
+SCENARIOS = (
+    Scenario('feed', 50, lambda request: (
+        'get_recipes' in request.folders and 'tags=' not in request.url
+    )),
+    Scenario('tag_filter', 15, lambda request: 'tags=' in request.url),
+    Scenario('favorites', 10, lambda request: (
+        'add_to_favorite' in request.folders
+        or request.folders[-1] == 'favorite'
+        or 'is_favorited' in request.url
+    )),
+    Scenario('shopping_list', 10, lambda request: (
+        'add_to_shopping_cart' in request.folders
+        or request.folders[-1] == 'shopping_cart'
+        or 'download_shopping_cart' in request.folders
+    )),
+    Scenario('catalogue', 10, lambda request: (
+        'get_ingradients' in request.folders
+        or 'get_tags_info' in request.folders
+    )),
+    Scenario('users', 5, lambda request: (
+        'get_user_info' in request.folders
+        or 'get_subscriptions' in request.folders
+    )),
+)
+
+
+def load_collection(path):
+    """Возвращает запросы коллекции, кроме заведомо ошибочных."""
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+    requests_list = []
+
+    def walk(items, folders):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'], folders + (item['name'].split(' //')[0],))
+                continue
+            if any('bad_requests' in folder for folder in folders):
+                continue
+            request = item['request']
+            url = request['url']
+            body = request.get('body', {}).get('raw') or None
+            requests_list.append(PostmanRequest(
+                folders=folders,
+                name=item['name'],
+                method=request['method'],
+                url=url['raw'] if isinstance(url, dict) else url,
+                body=body,
+                auth='No Auth' not in item['name'],
+            ))
+
+    walk(collection['item'], ())
+    return requests_list
+
+
+def endpoint_key(request):
+    """Название эндпоинта для отчета: метод и путь без baseUrl."""
+    return f"{request.method} {request.url.replace('{{baseUrl}}', '')}"
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Fixtures:
+    """Данные целевого сервера для подстановки переменных коллекции."""
+
+    def __init__(self, base_url, session):
+        self.base_url = base_url
+        self.recipe_ids = self.collect(session, '/api/recipes/?limit=100',
+                                       'id')
+        self.user_ids = self.collect(session, '/api/users/?limit=100', 'id')
+        tags = session.get(f'{base_url}/api/tags/').json()
+        self.tag_ids = [tag['id'] for tag in tags]
+        self.tag_slugs = [tag['slug'] for tag in tags]
+        ingredients = session.get(f'{base_url}/api/ingredients/').json()
+        self.ingredient_ids = [item['id'] for item in ingredients]
+        self.ingredient_letters = sorted(
+            {item['name'][:1] for item in ingredients if item['name']}
+        )
+        if not self.recipe_ids:
+            raise CommandError('На сервере нет рецептов. '
+                               'Заполните базу командой seed_bulk.')
+
+    def collect(self, session, path, field):
+        data = session.get(f'{self.base_url}{path}').json()
+        return [item[field] for item in data['results']]
+
+    def resolve(self, variable, rng):
+        if variable == 'baseUrl':
+            return self.base_url
+        choices = (
+            ('RecipeId', self.recipe_ids),
+            ('UserId', self.user_ids),
+            ('userId', self.user_ids),
+            ('TagSlug', self.tag_slugs),
+            ('TagId', self.tag_ids),
+            ('dientId', self.ingredient_ids),
+            ('FirstLatter', self.ingredient_letters),
+        )
+        for suffix, values in choices:
+            if variable.endswith(suffix) and values:
+                return str(rng.choice(values))
+        return None
+
+
+class Stats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, key, latency, status, queries):
+        with self.lock:
+            self.latencies[key].append(latency)
+            self.statuses[key][status] += 1
+            if queries is not None:
+                self.queries[key].append(queries)
+
+    def report(self, duration):
+        endpoints = {}
+        for key, latencies in sorted(self.latencies.items()):
+            queries = self.queries[key]
+            endpoints[key] = {
+                'requests': len(latencies),
+                'throughput': round(len(latencies) / duration, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'queries_per_request': (
+                    round(sum(queries) / len(queries), 2) if queries else None
+                ),
+                'statuses': dict(self.statuses[key]),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            'duration_s': round(duration, 2),
+            'requests': total,
+            'throughput': round(total / duration, 2),
+            'endpoints': endpoints,
+        }
+
+
+def git_revision():
+    """Ветка и коммит, чтобы сравнивать прогоны разных веток."""
+    try:
+        branch, commit = (
+            subprocess.check_output(
+                ['git', 'rev-parse', *arguments, 'HEAD'],
+                text=True, stderr=subprocess.DEVNULL,
+            ).strip()
+            for arguments in (['--abbrev-ref'], [])
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {'branch': branch, 'commit': commit}
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон API по сценариям из Postman-коллекции. '
+            'Для подсчета SQL-запросов запускайте сервер '
+            'с QUERY_COUNT_HEADER=True.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--collection', default=COLLECTION_PATH)
+        parser.add_argument('--serve', choices=('runserver', 'gunicorn'),
+                            help='Запустить локальный сервер на время '
+                                 'прогона.')
+        parser.add_argument('--email', help='Пользователь для запросов '
+                                            'с авторизацией.')
+        parser.add_argument('--password')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность прогона в секундах.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        self.base_url = options['base_url'].rstrip('/')
+        server = self.start_server(options['serve'])
+        try:
+            report = self.run(options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        for key, data in report['endpoints'].items():
+            self.stdout.write(
+                f"{key:<60} n={data['requests']:<6} "
+                f"p50={data['p50_ms']}ms p95={data['p95_ms']}ms "
+                f"p99={data['p99_ms']}ms q={data['queries_per_request']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} requests, {report['throughput']} rps. "
+            f"Saved to {options['output']}"
+        ))
+
+    def start_server(self, kind):
+        if kind is None:
+            return None
+        address = urlsplit(self.base_url).netloc
+        if kind == 'runserver':
+            command = [sys.executable, 'manage.py', 'runserver',
+                       '--noreload', address]
+        else:
+            command = ['gunicorn', 'foodgram.wsgi:application',
+                       '--bind', address]
+        environment = dict(os.environ, QUERY_COUNT_HEADER='True')
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR,
+                                  env=environment)
+        for _ in range(100):
+            try:
+                requests.get(f'{self.base_url}/api/tags/', timeout=1)
+                return server
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        server.terminate()
+        raise CommandError(f'Сервер на {self.base_url} не запустился.')
+
+    def login(self, session, email, password):
+        response = session.post(f'{self.base_url}/api/auth/token/login/',
+                                json={'email': email, 'password': password})
+        if response.status_code != 200:
+            raise CommandError(f'Не удалось войти: {response.text}')
+        return response.json()['auth_token']
+
+    def run(self, options):
+        session = requests.Session()
+        token = None
+        if options['email']:
+            token = self.login(session, options['email'],
+                               options['password'])
+        fixtures = Fixtures(self.base_url, session)
+        collection = [request for request in load_collection(
+            options['collection']) if token or not request.auth]
+        scenarios = []
+        for scenario in SCENARIOS:
+            steps = [request for request in collection
+                     if scenario.matches(request)]
+            if steps:
+                scenarios.append((scenario, steps))
+        if not scenarios:
+            raise CommandError('В коллекции нет подходящих запросов.')
+
+        stats = Stats()
+        deadline = time.monotonic() + options['duration']
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            workers = [
+                executor.submit(self.worker, scenarios, fixtures, token,
+                                stats, deadline,
+                                random.Random(options['seed'] + worker))
+                for worker in range(options['concurrency'])
+            ]
+            for worker in workers:
+                worker.result()
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'git': git_revision(),
+            'base_url': self.base_url,
+            'concurrency': options['concurrency'],
+            'scenarios': {scenario.name: scenario.weight
+                          for scenario, _ in scenarios},
+            **stats.report(time.monotonic() - started),
+        }
+
+    def worker(self, scenarios, fixtures, token, stats, deadline, rng):
+        session = requests.Session()
+        weights = [scenario.weight for scenario, _ in scenarios]
+        while time.monotonic() < deadline:
+            _, steps = rng.choices(scenarios, weights=weights)[0]
+            # Переменные связываются на всю итерацию сценария, чтобы
+            # добавление и удаление затрагивали один и тот же рецепт.
+            bound = {}
+            for request in steps:
+                self.send(session, request, fixtures, token, stats, rng,
+                          bound)
+
+    def send(self, session, request, fixtures, token, stats, rng, bound):
+        def substitute(text):
+            def replace(match):
+                name = match.group(1)
+                if name not in bound:
+                    bound[name] = fixtures.resolve(name, rng)
+                if bound[name] is None:
+                    raise KeyError(name)
+                return bound[name]
+            return VARIABLE.sub(replace, text)
+
+        try:
+            url = substitute(request.url)
+            body = substitute(request.body) if request.body else None
+        except KeyError:
+            return
+        headers = {'Content-Type': 'application/json'}
+        if request.auth and token:
+            headers['Authorization'] = f'Token {token}'
+        started = time.monotonic()
+        response = session.request(request.method, url, data=body,
+                                   headers=headers)
+        latency = time.monotonic() - started
+        queries = response.headers.get('X-Query-Count')
+        stats.add(endpoint_key(request), latency, response.status_code,
+                  int(queries) if queries else None)
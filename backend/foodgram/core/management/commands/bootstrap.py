@@ -0,0 +1,175 @@
+import os
+import time
+from hashlib import sha256
+
+from core.models import Fingerprint
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.db.models import Count, Max
+from recipes import snapshots
+from recipes.models import Ingredient
+
+from .csv_data_load import DATA_PATH
+
+FINGERPRINT_FILE = '.bootstrap-fingerprint'
+
+
+def hash_files(paths):
+    """Хэш содержимого файлов вместе с их путями."""
+    digest = sha256()
+    for name, path in sorted(paths):
+        digest.update(name.encode('utf-8') + b'\0')
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 16), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def migrations_fingerprint():
+    """Хэш файлов миграций всех приложений, то есть графа миграций."""
+    paths = []
+    for app_config in apps.get_app_configs():
+        directory = os.path.join(app_config.path, 'migrations')
+        if not os.path.isdir(directory):
+            continue
+        paths += [(f'{app_config.label}/{entry.name}', entry.path)
+                  for entry in os.scandir(directory)
+                  if entry.name.endswith('.py')]
+    return hash_files(paths)
+
+
+def static_fingerprint():
+    """Хэш манифеста статики: всех файлов, которые соберет collectstatic."""
+    paths = {}
+    for finder in finders.get_finders():
+        for name, storage in finder.list([]):
+            # Как и collectstatic, берется первый найденный файл с именем.
+            paths.setdefault(name, storage.path(name))
+    return hash_files(paths.items())
+
+
+def seed_fingerprint():
+    paths = []
+    for root, _, files in os.walk(DATA_PATH):
+        paths += [(os.path.relpath(os.path.join(root, name), DATA_PATH),
+                   os.path.join(root, name)) for name in files]
+    return hash_files(paths)
+
+
+def catalogue_fingerprint():
+    state = Ingredient.objects.aggregate(modified=Max('modified'),
+                                         count=Count('id'))
+    return sha256(repr(sorted(state.items())).encode('utf-8')).hexdigest()
+
+
+def superuser_fingerprint():
+    if not os.getenv('DEFAULT_SU_NAME'):
+        return None
+    return sha256('|'.join(
+        os.getenv(name, '') for name in ('DEFAULT_SU_NAME', 'DEFAULT_SU_MAIL')
+    ).encode('utf-8')).hexdigest()
+
+
+class DatabaseFingerprint:
+    """Отпечаток фазы хранится в таблице core.Fingerprint."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def is_current(self, value):
+        try:
+            return Fingerprint.is_current(self.key, value)
+        except DatabaseError:
+            # До первой миграции таблицы отпечатков еще нет.
+            return False
+
+    def store(self, value):
+        Fingerprint.store(self.key, value)
+
+
+class FileFingerprint:
+    """Отпечаток фазы хранится рядом с ее результатом.
+
+    Собранная статика и снимок справочника живут в файловой системе,
+    а не в базе: новый контейнер с той же базой должен собрать их заново.
+    """
+
+    def __init__(self, directory, filename):
+        self.directory = directory
+        self.filename = filename
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.filename)
+
+    def is_current(self, value):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return file.read() == value
+        except FileNotFoundError:
+            return False
+
+    def store(self, value):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(value)
+
+
+class Command(BaseCommand):
+    help = ('Готовит контейнер к запуску в одном процессе: миграции, '
+            'загрузка данных, снимок справочника, статика и '
+            'суперпользователь. '
+            'Фазы с неизменившимися входными данными пропускаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Выполнить все фазы без проверки '
+                                 'отпечатков.')
+
+    def get_phases(self):
+        """Фазы по порядку: (название, отпечаток входных данных,
+        хранилище отпечатка, команда с аргументами).
+        """
+        return (
+            ('migrate', migrations_fingerprint,
+             DatabaseFingerprint('bootstrap:migrate'),
+             ('migrate', {'interactive': False})),
+            ('seed', seed_fingerprint,
+             DatabaseFingerprint('bootstrap:seed'),
+             ('csv_data_load', {})),
+            ('catalogue snapshot', catalogue_fingerprint,
+             FileFingerprint(snapshots.snapshot_root(), FINGERPRINT_FILE),
+             ('snapshot_catalogue', {})),
+            ('collectstatic', static_fingerprint,
+             FileFingerprint(settings.STATIC_ROOT, FINGERPRINT_FILE),
+             ('collectstatic', {'interactive': False})),
+            ('superuser', superuser_fingerprint,
+             DatabaseFingerprint('bootstrap:superuser'),
+             ('create_default_su', {})),
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        for name, fingerprint, stored, (command, kwargs) in self.get_phases():
+            phase_started = time.monotonic()
+            value = fingerprint()
+            if value is None:
+                status = 'not configured, skipped'
+            elif not options['force'] and stored.is_current(value):
+                status = 'unchanged, skipped'
+            else:
+                call_command(command, stdout=self.stdout, stderr=self.stderr,
+                             verbosity=options['verbosity'], **kwargs)
+                stored.store(value)
+                status = 'done'
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {status} in '
+                f'{time.monotonic() - phase_started:.2f}s'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'bootstrap: {time.monotonic() - started:.2f}s'
+        ))
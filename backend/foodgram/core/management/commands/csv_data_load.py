@@ -1,83 +1,265 @@
 import csv
+import json
 import os
+import time
+from hashlib import sha256
+from itertools import islice
 
+import shortuuid
+from core.models import Fingerprint
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.files import File
 from django.core.management.base import BaseCommand
-from recipes.models import Ingredient, Recipe, Tag
+from django.db import transaction
+from django.utils import timezone
+from recipes import shopping_list, snapshots
+from recipes.models import (Ingredient, IngredientPerRecipe, Recipe,
+                            ShopingCart, Tag)
 
 User = get_user_model()
 
+DATA_PATH = os.path.join(settings.BASE_DIR, '../filling_data/')
+MEDIA_DIR = 'filling_media'
+# Первый найденный формат набора данных используется для загрузки.
+FORMATS = ('.csv', '.ndjson', '.json')
+BATCH_SIZE = 1000
+
+# Порядок загрузки и колонки CSV-файлов без заголовка.
+DATASETS = (
+    ('users', ('username', 'first_name', 'last_name', 'email', 'password')),
+    ('ingredients', ('name', 'measurement_unit')),
+    ('tags', ('name', 'slug')),
+    ('recipes', ('name', 'image', 'text', 'author', 'cooking_time', 'tags',
+                 'ingredients')),
+    ('recipes_ingredients', ('recipe', 'ingredient', 'amount')),
+)
 
-def user_import(row):
-    if not User.objects.filter(username=row[0]):
-        User.objects.create_user(
-            username=row[0],
-            first_name=row[1],
-            last_name=row[2],
-            email=row[3],
-            password=row[4]
-        )
 
+def find_source(path, name):
+    for extension in FORMATS:
+        filename = os.path.join(path, name + extension)
+        if os.path.isfile(filename):
+            return filename
+    return None
 
-def ingredients_import(row):
-    Ingredient.objects.get_or_create(
-        name=row[0],
-        measurement_unit=row[1]
-    )
 
+def file_fingerprint(filename):
+    digest = sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-def tags_import(row):
-    Tag.objects.get_or_create(
-        name=row[0],
-        slug=row[1]
-    )
 
+def read_rows(filename, columns):
+    """Строки файла в виде словарей, CSV и NDJSON читаются построчно."""
+    with open(filename, encoding='utf-8') as file:
+        if filename.endswith('.csv'):
+            for row in csv.reader(file):
+                if row:
+                    yield dict(zip(columns, (value.strip()
+                                             for value in row)))
+        elif filename.endswith('.ndjson'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(file)
 
-def recipes_import(row):
-    # Get the image path from the row
-    image_path = row[1]
-    recipe = Recipe.objects.get_or_create(
-        name=row[0],
-        text=row[2],
-        author_id=row[3],
-        cooking_time=row[4],
-    )[0]
-    tags = list(row[5].split(","))
-    ingredients = list(row[6].split(","))
-    # Handle the image file
-    if image_path:
-        # Open the image file
-        with open(os.path.join('../filling_data/filling_media/', image_path),
-                  'rb') as img_file:
-            # Save the image to the recipe instance
-            recipe.image.save(os.path.basename(image_path), File(img_file))
 
-    # Process tags and ingredients
-    for tag in tags:
-        recipe.tags.add(tag)
-    for ingredient in ingredients:
-        recipe.ingredients.add(ingredient)
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
 
 
-def recipes_ingredients(row):
-    pass
+def id_list(value):
+    """Список id из строки "1, 3,5" или из JSON-массива."""
+    if isinstance(value, str):
+        value = value.split(',')
+    return [int(pk) for pk in value or () if str(pk).strip()]
 
 
-action = {
-    'users.csv': user_import,
-    'ingredients.csv': ingredients_import,
-    'tags.csv': tags_import,
-    'recipes.csv': recipes_import
-}
+def existing_ids(model, ids):
+    return set(model.objects.filter(pk__in=set(ids))
+               .values_list('pk', flat=True))
 
 
 class Command(BaseCommand):
+    help = ('Загружает пользователей, справочники и рецепты из filling_data '
+            '(CSV, NDJSON или JSON). Файлы, не изменившиеся с прошлой '
+            'загрузки, пропускаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DATA_PATH,
+                            help='Каталог с файлами данных.')
+        parser.add_argument('--force', action='store_true',
+                            help='Загрузить файлы, даже если они '
+                                 'не изменились.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
     def handle(self, *args, **options):
-        path = os.path.join(settings.BASE_DIR, '../filling_data/')
-        for key in action.keys():
-            with open(path + key, 'r', encoding='utf-8') as csv_file:
-                reader = csv.reader(csv_file)
-                for row in reader:
-                    action[key](row)
+        self.path = options['path']
+        self.batch_size = options['batch_size']
+        self.ingredients_created = 0
+        self.recipes_changed = set()
+        for name, columns in DATASETS:
+            filename = find_source(self.path, name)
+            if filename is None:
+                continue
+            key = f'csv_data_load:{name}'
+            fingerprint = file_fingerprint(filename)
+            if not options['force'] and Fingerprint.is_current(key,
+                                                               fingerprint):
+                self.stdout.write(f'{name}: unchanged, skipped')
+                continue
+            started = time.monotonic()
+            loader = getattr(self, f'load_{name}')
+            # Файл загружается целиком или не загружается вовсе,
+            # а отпечаток сохраняется только вместе с данными.
+            with transaction.atomic():
+                count = sum(
+                    loader(batch) for batch in
+                    batches(read_rows(filename, columns), self.batch_size)
+                )
+                Fingerprint.store(key, fingerprint)
+                if name == 'ingredients' and self.ingredients_created:
+                    # bulk_create не отправляет сигналы, поэтому снимок
+                    # справочника перезаписывается здесь, один раз на файл.
+                    snapshots.ingredients_changed()
+                if self.recipes_changed:
+                    # Ингредиенты рецептов изменены в обход сигналов:
+                    # списки покупок с этими рецептами считаются заново.
+                    shopping_list.rebuild(ShopingCart.objects.filter(
+                        recipe_id__in=self.recipes_changed
+                    ).values('user_id'))
+                    self.recipes_changed.clear()
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {count} rows from {os.path.basename(filename)} '
+                f'in {time.monotonic() - started:.1f}s'
+            ))
+
+    def load_users(self, rows):
+        rows = {row['username']: row for row in rows}
+        existing = set(User.objects.filter(username__in=rows)
+                       .values_list('username', flat=True))
+        # Пароль хэшируется только для новых пользователей: make_password
+        # намного дороже самой вставки, а пароль существующих не меняется.
+        User.objects.bulk_create(
+            (User(username=username, first_name=row['first_name'],
+                  last_name=row['last_name'], email=row['email'],
+                  password=make_password(row['password']))
+             for username, row in rows.items() if username not in existing),
+        )
+        User.objects.bulk_update(
+            [User(pk=pk, first_name=rows[username]['first_name'],
+                  last_name=rows[username]['last_name'],
+                  email=rows[username]['email'])
+             for pk, username in User.objects.filter(username__in=existing)
+             .values_list('pk', 'username')],
+            ('first_name', 'last_name', 'email'),
+        )
+        return len(rows)
+
+    def load_ingredients(self, rows):
+        # У ингредиента нет уникального ключа для ON CONFLICT, а ключ
+        # (название, единица) совпадает со всеми данными строки, поэтому
+        # вставляются только отсутствующие пары.
+        keys = {(row['name'], row['measurement_unit']) for row in rows}
+        existing = set(
+            Ingredient.objects.filter(name__in={name for name, _ in keys})
+            .values_list('name', 'measurement_unit')
+        )
+        created = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in keys - existing
+        )
+        self.ingredients_created += len(created)
+        return len(rows)
+
+    def load_tags(self, rows):
+        rows = {row['name']: row for row in rows}
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=row['slug']) for name, row in rows.items()],
+            update_conflicts=True,
+            unique_fields=('name',),
+            update_fields=('slug', 'modified'),
+        )
+        return len(rows)
+
+    def load_recipes(self, rows):
+        # ON CONFLICT не может обновить одну строку дважды за запрос.
+        keys = {(int(row['author']), row['name']): row for row in rows}
+        rows = list(keys.values())
+        now = timezone.now()
+        Recipe.objects.bulk_create(
+            [Recipe(name=name, author_id=author_id, text=row['text'],
+                    cooking_time=int(row['cooking_time']),
+                    short_link=shortuuid.ShortUUID().random(),
+                    modified=now)
+             for (author_id, name), row in keys.items()],
+            update_conflicts=True,
+            unique_fields=('name', 'author'),
+            update_fields=('text', 'cooking_time', 'version', 'modified'),
+        )
+        stored = Recipe.objects.filter(
+            author_id__in={author for author, _ in keys},
+            name__in={name for _, name in keys},
+        ).only('id', 'author_id', 'name', 'image')
+        tag_ids = existing_ids(
+            Tag, (pk for row in rows for pk in id_list(row.get('tags'))))
+        ingredient_ids = existing_ids(
+            Ingredient,
+            (pk for row in rows for pk in id_list(row.get('ingredients'))))
+        tag_links = []
+        ingredient_links = []
+        with_images = []
+        for recipe in stored:
+            row = keys.get((recipe.author_id, recipe.name))
+            if row is None:
+                continue
+            self.recipes_changed.add(recipe.pk)
+            tag_links += [
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=pk)
+                for pk in id_list(row.get('tags')) if pk in tag_ids
+            ]
+            ingredient_links += [
+                IngredientPerRecipe(recipe_id=recipe.pk, ingredient_id=pk)
+                for pk in id_list(row.get('ingredients'))
+                if pk in ingredient_ids
+            ]
+            # Картинка копируется только рецептам, у которых ее еще нет.
+            if row.get('image') and not recipe.image:
+                self.attach_image(recipe, row['image'])
+                with_images.append(recipe)
+        Recipe.tags.through.objects.bulk_create(tag_links,
+                                                ignore_conflicts=True)
+        IngredientPerRecipe.objects.bulk_create(ingredient_links,
+                                                ignore_conflicts=True)
+        Recipe.objects.bulk_update(with_images, ('image',))
+        return len(rows)
+
+    def attach_image(self, recipe, image):
+        with open(os.path.join(self.path, MEDIA_DIR, image), 'rb') as file:
+            recipe.image.save(os.path.basename(image), File(file),
+                              save=False)
+
+    def load_recipes_ingredients(self, rows):
+        links = {(int(row['recipe']), int(row['ingredient'])):
+                 int(row.get('amount') or 1) for row in rows}
+        recipe_ids = existing_ids(Recipe, (link[0] for link in links))
+        self.recipes_changed |= recipe_ids
+        ingredient_ids = existing_ids(Ingredient,
+                                      (link[1] for link in links))
+        IngredientPerRecipe.objects.bulk_create(
+            [IngredientPerRecipe(recipe_id=recipe_id,
+                                 ingredient_id=ingredient_id, amount=amount)
+             for (recipe_id, ingredient_id), amount in links.items()
+             if recipe_id in recipe_ids and ingredient_id in ingredient_ids],
+            update_conflicts=True,
+            unique_fields=('ingredient', 'recipe'),
+            update_fields=('amount',),
+        )
+        return len(rows)
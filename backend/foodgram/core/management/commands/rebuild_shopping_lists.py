@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает итоги списков покупок с нуля по корзинам, '
+            'например после массовой загрузки в обход сигналов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='user_ids',
+                            help='id пользователя, по умолчанию все.')
+
+    def handle(self, *args, **options):
+        count = shopping_list.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} shopping list rows rebuilt'
+        ))
@@ -0,0 +1,185 @@
+import csv
+import os
+import random
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes import shopping_list
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientPerRecipe,
+                            Recipe, ShopingCart, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+DATA_PATH = os.path.join(settings.BASE_DIR, '../filling_data/')
+
+
+class PowerLawSampler:
+    """Выбирает элементы так, что первые по рангу встречаются чаще всего.
+
+    Вес элемента с рангом r равен 1 / r ** exponent (закон Ципфа).
+    """
+
+    def __init__(self, population, exponent, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(population) + 1)
+        ))
+
+    def sample(self, k):
+        return self.rng.choices(self.population,
+                                cum_weights=self.cum_weights, k=k)
+
+
+def chunks(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def ensure_catalogue():
+    """Загружает теги и ингредиенты из filling_data, если их еще нет."""
+    if not Ingredient.objects.exists():
+        with open(DATA_PATH + 'ingredients.csv', encoding='utf-8') as file:
+            Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in csv.reader(file)
+            )
+    if not Tag.objects.exists():
+        with open(DATA_PATH + 'tags.csv', encoding='utf-8') as file:
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug) for name, slug in csv.reader(file)
+            )
+    return (list(Ingredient.objects.values_list('id', flat=True)),
+            list(Tag.objects.values_list('id', flat=True)))
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, рецептами, '
+            'избранным, корзинами и подписками в заданном масштабе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10,
+                            help='Среднее число ингредиентов в рецепте.')
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Показатель степенного распределения.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.exponent = options['exponent']
+        ingredient_ids, tag_ids = ensure_catalogue()
+
+        user_ids = self.timed('users', self.create_users, options['users'])
+        recipe_ids = self.timed(
+            'recipes', self.create_recipes, options['recipes'], user_ids,
+            ingredient_ids, tag_ids, options['ingredients_per_recipe'])
+        self.timed('favorites', self.create_user_recipe_links,
+                   FavoriteRecipe, options['favorites'], user_ids, recipe_ids)
+        self.timed('shopping carts', self.create_user_recipe_links,
+                   ShopingCart, options['carts'], user_ids, recipe_ids)
+        self.timed('subscriptions', self.create_subscriptions,
+                   options['subscriptions'], user_ids)
+        # Корзины вставлены пакетно, без сигналов, поэтому итоги списков
+        # покупок считаются одним проходом в конце.
+        self.timed('shopping lists', shopping_list.rebuild)
+
+    def timed(self, name, function, *args):
+        started = time.monotonic()
+        result = function(*args)
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: {time.monotonic() - started:.1f}s'
+        ))
+        return result
+
+    def create_users(self, total):
+        # Хэш пароля считается один раз: make_password на каждого
+        # пользователя заняла бы больше времени, чем сама вставка.
+        password = make_password('password')
+        prefix = f'bulk{self.rng.getrandbits(32):08x}'
+        user_ids = []
+        for start, size in chunks(total, self.batch_size):
+            users = User.objects.bulk_create(
+                User(username=f'{prefix}_{number}',
+                     email=f'{prefix}_{number}@example.org',
+                     first_name='Имя', last_name='Фамилия',
+                     password=password)
+                for number in range(start, start + size)
+            )
+            user_ids += [user.id for user in users]
+        return user_ids
+
+    def create_recipes(self, total, user_ids, ingredient_ids, tag_ids,
+                       ingredients_per_recipe):
+        authors = PowerLawSampler(user_ids, self.exponent, self.rng)
+        ingredients = PowerLawSampler(ingredient_ids, self.exponent,
+                                      self.rng)
+        prefix = f'bulk{self.rng.getrandbits(32):08x}'
+        recipe_ids = []
+        for start, size in chunks(total, self.batch_size):
+            with transaction.atomic():
+                recipes = Recipe.objects.bulk_create(
+                    Recipe(author_id=author_id,
+                           name=f'Рецепт {number}',
+                           text='Синтетический рецепт',
+                           cooking_time=self.rng.randint(1, 600),
+                           short_link=f'{prefix}{number}')
+                    for number, author_id in enumerate(
+                        authors.sample(size), start)
+                )
+                tag_links = []
+                ingredient_links = []
+                for recipe in recipes:
+                    for tag_id in self.rng.sample(
+                            tag_ids, self.rng.randint(1, len(tag_ids))):
+                        tag_links.append(Recipe.tags.through(
+                            recipe_id=recipe.id, tag_id=tag_id))
+                    count = max(1, int(self.rng.gauss(
+                        ingredients_per_recipe, ingredients_per_recipe / 3)))
+                    for ingredient_id in set(ingredients.sample(count)):
+                        ingredient_links.append(IngredientPerRecipe(
+                            recipe_id=recipe.id, ingredient_id=ingredient_id,
+                            amount=self.rng.randint(1, 1000)))
+                Recipe.tags.through.objects.bulk_create(
+                    tag_links, batch_size=self.batch_size)
+                IngredientPerRecipe.objects.bulk_create(
+                    ingredient_links, batch_size=self.batch_size)
+            recipe_ids += [recipe.id for recipe in recipes]
+        return recipe_ids
+
+    def create_user_recipe_links(self, model, total, user_ids, recipe_ids):
+        """Активные пользователи и популярные рецепты встречаются чаще."""
+        users = PowerLawSampler(user_ids, self.exponent, self.rng)
+        recipes = PowerLawSampler(recipe_ids, self.exponent, self.rng)
+        for _, size in chunks(total, self.batch_size):
+            model.objects.bulk_create(
+                (model(user_id=user_id, recipe_id=recipe_id)
+                 for user_id, recipe_id in zip(users.sample(size),
+                                               recipes.sample(size))),
+                ignore_conflicts=True,
+            )
+
+    def create_subscriptions(self, total, user_ids):
+        followers = PowerLawSampler(user_ids, self.exponent, self.rng)
+        authors = PowerLawSampler(user_ids, self.exponent, self.rng)
+        for _, size in chunks(total, self.batch_size):
+            Subscription.objects.bulk_create(
+                (Subscription(user_id=user_id, target_user_id=author_id)
+                 for user_id, author_id in zip(followers.sample(size),
+                                               authors.sample(size))
+                 if user_id != author_id),
+                ignore_conflicts=True,
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from recipes import snapshots
+
+
+class Command(BaseCommand):
+    help = ('Записывает справочник ингредиентов в MEDIA_ROOT/catalogue/ '
+            'в виде JSON со сжатыми копиями для nginx.')
+
+    def handle(self, *args, **options):
+        pointer = snapshots.write_ingredients_snapshot()
+        variants = ', '.join(
+            ['json'] + [encoding for encoding, _ in snapshots.ENCODINGS]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{pointer['count']} ingredients saved to "
+            f"{pointer['filename']} ({variants})"
+        ))
@@ -0,0 +1,99 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.constants import STARTUP_IMPORT_BUDGET_MS
+
+# Что импортирует воркер gunicorn до первого ответа: приложение и URLconf.
+MODULES = ('foodgram.wsgi', 'foodgram.urls')
+# Тяжелые зависимости, которые нужны только отдельным эндпоинтам.
+DENIED = ('reportlab', 'PIL')
+
+IMPORT_TIME = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$'
+)
+
+
+def profile_imports(modules):
+    """Запускает чистый интерпретатор с -X importtime.
+
+    Возвращает список (модуль, собственное время, суммарное время,
+    глубина) в микросекундах в порядке завершения импорта.
+    """
+    code = ''.join(f'import {module}\n' for module in modules)
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode:
+        raise CommandError(f'Import failed:\n{result.stderr}')
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append((module, int(own), int(cumulative),
+                         len(indent) // 2))
+    return rows
+
+
+def by_package(rows):
+    """Собственное время импорта, сложенное по пакетам верхнего уровня."""
+    totals = defaultdict(int)
+    for module, own, _, _ in rows:
+        totals[module.split('.')[0]] += own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+class Command(BaseCommand):
+    help = ('Показывает, сколько времени занимает импорт приложения при '
+            'холодном старте воркера, и завершается с ошибкой, если '
+            'превышен бюджет или загружены лишние тяжелые модули.')
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', dest='modules',
+                            help='Модуль для импорта, по умолчанию '
+                                 'foodgram.wsgi и foodgram.urls.')
+        parser.add_argument('--budget', type=float,
+                            default=STARTUP_IMPORT_BUDGET_MS,
+                            help='Допустимое время импорта в мс.')
+        parser.add_argument('--deny', action='append',
+                            help='Пакет, который не должен загружаться '
+                                 'при старте, по умолчанию reportlab и PIL.')
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        rows = profile_imports(options['modules'] or MODULES)
+        total = sum(own for _, own, _, _ in rows) / 1000
+        top = options['top']
+
+        self.stdout.write('Packages by own import time, ms:')
+        for package, own in by_package(rows)[:top]:
+            self.stdout.write(f'{own / 1000:10.1f}  {package}')
+        self.stdout.write('Slowest imports with dependencies, ms:')
+        for module, _, cumulative, depth in sorted(
+                rows, key=lambda row: row[2], reverse=True)[:top]:
+            self.stdout.write(f'{cumulative / 1000:10.1f}  '
+                              f'{"  " * depth}{module}')
+        self.stdout.write(f'Total: {total:.1f} ms, {len(rows)} modules')
+
+        denied = options['deny'] or DENIED
+        loaded = sorted({module for module, _, _, _ in rows
+                         if module.split('.')[0] in denied})
+        errors = []
+        if loaded:
+            errors.append('Heavy modules are imported at startup: '
+                          + ', '.join(loaded))
+        if total > options['budget']:
+            errors.append(f'Import time {total:.1f} ms exceeds the budget '
+                          f'of {options["budget"]:.0f} ms')
+        if errors:
+            raise CommandError('\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Startup import budget met'))
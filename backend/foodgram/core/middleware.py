@@ -0,0 +1,27 @@
+from django.db import connection
+
+
+class QueryCountMiddleware:
+    """Добавляет в ответ заголовок с числом выполненных SQL-запросов.
+
+    Подключается только при QUERY_COUNT_HEADER=True и нужен для
+    нагрузочных прогонов команды benchmark.
+    """
+
+    header = 'X-Query-Count'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        response[self.header] = str(queries)
+        return response
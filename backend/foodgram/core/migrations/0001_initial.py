@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Что обработано')),
+                ('value', models.CharField(max_length=64, verbose_name='Хэш содержимого')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обработки')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток данных',
+                'verbose_name_plural': 'Отпечатки данных',
+            },
+        ),
+    ]
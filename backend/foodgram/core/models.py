@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class Fingerprint(models.Model):
+    """Отпечаток уже обработанных входных данных.
+
+    По нему команды загрузки пропускают файлы, которые не изменились
+    с прошлого запуска.
+    """
+
+    key = models.CharField(
+        verbose_name='Что обработано',
+        max_length=255,
+        unique=True,
+    )
+    value = models.CharField(
+        verbose_name='Хэш содержимого',
+        max_length=64,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата обработки',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Отпечаток данных'
+        verbose_name_plural = 'Отпечатки данных'
+
+    def __str__(self) -> str:
+        return self.key
+
+    @classmethod
+    def is_current(cls, key, value):
+        return cls.objects.filter(key=key, value=value).exists()
+
+    @classmethod
+    def store(cls, key, value):
+        cls.objects.update_or_create(key=key, defaults={'value': value})
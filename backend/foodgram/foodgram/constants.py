@@ -5,3 +5,16 @@ MAX_TEXT_DESCRIPTION = 512
 MAX_TAG_LENGTH = 64
 MAX_NAME = 128
 MAX_UNIT_LENGTH = 16
+MIN_INGREDIENT_AMOUNT = 1
+MAX_INGREDIENT_AMOUNT = 10000
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60
+COUNT_CACHE_TIMEOUT = 30
+COUNT_ESTIMATE_THRESHOLD = 10000
+CATALOGUE_CHECK_INTERVAL = 5
+AUTOCOMPLETE_CACHE_SIZE = 1024
+AUTOCOMPLETE_MAX_LIMIT = 100
+FUZZY_SIMILARITY_THRESHOLD = 0.3
+RECIPE_IMPORT_MAX_ITEMS = 1000
+RECIPE_IMPORT_CHUNK_SIZE = 200
+RECIPE_IMAGE_WORKERS = 2
+STARTUP_IMPORT_BUDGET_MS = 1500
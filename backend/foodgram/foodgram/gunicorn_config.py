@@ -0,0 +1,12 @@
+# Настройки gunicorn: gunicorn -c python:foodgram.gunicorn_config
+
+bind = '0.0.0.0:8000'
+
+
+def post_worker_init(worker):
+    # Индекс подсказок ингредиентов загружается, когда воркер уже
+    # импортировал приложение, а не при импорте foodgram.wsgi:
+    # так импорт остается без обращений к базе.
+    from recipes import autocomplete
+
+    autocomplete.ingredients.warm_up()
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
@@ -42,6 +43,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Report SQL query count per response for the benchmark command
+if os.getenv('QUERY_COUNT_HEADER') == 'True':
+    MIDDLEWARE.insert(0, 'core.middleware.QueryCountMiddleware')
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -0,0 +1,163 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import DatabaseError, connections
+from django.db.models import Value
+from django.db.models.functions import Lower, Replace
+
+from foodgram.constants import (AUTOCOMPLETE_CACHE_SIZE,
+                                FUZZY_SIMILARITY_THRESHOLD)
+
+from . import catalogue
+from .models import Ingredient
+
+
+def normalize(text):
+    """Приводит название к виду для сравнения: регистр и ё/е не важны."""
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+def trigrams(text):
+    """Триграммы слов текста, как их строит pg_trgm."""
+    result = set()
+    for word in re.findall(r'\w+', normalize(text)):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class CatalogueIndex(ABC):
+    """Поисковый индекс по названиям объектов справочника.
+
+    Индекс строится из recipes.catalogue и перестраивается, когда
+    справочник перечитан из базы. Результаты для последних запросов
+    хранятся до следующей перестройки.
+    """
+
+    def __init__(self, source, cache_size=AUTOCOMPLETE_CACHE_SIZE):
+        self.source = source
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._objects_map = None
+        self._results = OrderedDict()
+
+    @abstractmethod
+    def build(self, objects):
+        """Строит индекс по объектам, отсортированным по названию."""
+
+    @abstractmethod
+    def find(self, query, limit):
+        """Первые limit объектов по нормализованному запросу."""
+
+    def search(self, query, limit):
+        """Первые limit объектов, подходящих под запрос, или все без limit."""
+        query = normalize(query)
+        objects_map = self.source.objects
+        with self._lock:
+            if objects_map is not self._objects_map:
+                self.build([obj for _, _, obj in sorted(
+                    (normalize(obj.name), obj.pk, obj)
+                    for obj in objects_map.values()
+                )])
+                self._results.clear()
+                self._objects_map = objects_map
+            key = (query, limit)
+            found = self._results.get(key)
+            if found is not None:
+                self._results.move_to_end(key)
+                return found
+            found = self.find(query, limit)
+            self._results[key] = found
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+            return found
+
+    def warm_up(self):
+        """Загружает справочник заранее, например при старте воркера."""
+        try:
+            self.search('', 1)
+        except DatabaseError:
+            # База еще не готова (например, до миграций) —
+            # индекс загрузится при первом запросе.
+            pass
+
+
+class PrefixIndex(CatalogueIndex):
+    """Поиск по началу названия в отсортированном списке."""
+
+    def build(self, objects):
+        self._keys = [normalize(obj.name) for obj in objects]
+        self._objects = objects
+
+    def find(self, prefix, limit):
+        start = bisect_left(self._keys, prefix)
+        end = start
+        stop = len(self._keys)
+        if limit is not None:
+            stop = min(start + limit, stop)
+        while end < stop and self._keys[end].startswith(prefix):
+            end += 1
+        return self._objects[start:end]
+
+
+class TrigramIndex(CatalogueIndex):
+    """Нечеткий поиск по сходству триграмм, как similarity() в pg_trgm."""
+
+    threshold = FUZZY_SIMILARITY_THRESHOLD
+
+    def build(self, objects):
+        self._objects = objects
+        self._sizes = []
+        self._postings = {}
+        for position, obj in enumerate(objects):
+            grams = trigrams(obj.name)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def find(self, query, limit):
+        grams = trigrams(query)
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        ranked = []
+        for position, count in shared.items():
+            similarity = count / (len(grams) + self._sizes[position] - count)
+            if similarity >= self.threshold:
+                ranked.append((-similarity, position))
+        ranked.sort()
+        return [self._objects[position] for _, position in ranked[:limit]]
+
+
+def fuzzy_search_database(query, limit):
+    """Нечеткий поиск в PostgreSQL по GIN-индексу pg_trgm.
+
+    Выражение search_name совпадает с выражением индекса
+    ingredient_name_trgm_idx, поэтому оператор % использует индекс.
+    """
+    search_name = Replace(Lower('name'), Value('ё'), Value('е'))
+    return list(
+        Ingredient.objects
+        .annotate(search_name=search_name)
+        .filter(search_name__trigram_similar=normalize(query))
+        .annotate(similarity=TrigramSimilarity(search_name,
+                                               normalize(query)))
+        .order_by('-similarity', 'name')[:limit]
+    )
+
+
+def fuzzy_search(query, limit):
+    """Нечеткий поиск ингредиентов: pg_trgm в PostgreSQL, иначе в памяти."""
+    if connections[Ingredient.objects.db].vendor == 'postgresql':
+        return fuzzy_search_database(query, limit)
+    return fuzzy_ingredients.search(query, limit)
+
+
+ingredients = PrefixIndex(catalogue.ingredients)
+fuzzy_ingredients = TrigramIndex(catalogue.ingredients)
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.db.models import Count, Max
+
+from foodgram.constants import CATALOGUE_CHECK_INTERVAL
+
+from .models import Ingredient, Tag
+
+
+class Catalogue:
+    """Справочник в памяти процесса с проверкой версии по базе.
+
+    Версия справочника — время последнего изменения и число строк таблицы.
+    Она сверяется с базой не чаще раза в CATALOGUE_CHECK_INTERVAL секунд,
+    поэтому правки из других процессов видны с небольшой задержкой, а
+    правки в текущем процессе сбрасывают справочник сразу через сигналы.
+    """
+
+    def __init__(self, model, check_interval=CATALOGUE_CHECK_INTERVAL):
+        self.model = model
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._objects = None
+        self._version = None
+        self._checked_at = 0
+
+    def get_db_version(self):
+        state = self.model.objects.aggregate(modified=Max('modified'),
+                                             count=Count('id'))
+        return state['modified'], state['count']
+
+    def invalidate(self):
+        with self._lock:
+            self._objects = None
+
+    @property
+    def objects(self):
+        """Словарь id -> объект, актуальный на момент последней проверки."""
+        now = time.monotonic()
+        with self._lock:
+            objects = self._objects
+            fresh = now - self._checked_at < self.check_interval
+        if objects is not None and fresh:
+            return objects
+        version = self.get_db_version()
+        if objects is None or version != self._version:
+            objects = {obj.pk: obj for obj in self.model.objects.all()}
+            with self._lock:
+                self._objects = objects
+                self._version = version
+                self._checked_at = now
+        else:
+            with self._lock:
+                self._checked_at = now
+        return objects
+
+    def get(self, pk):
+        try:
+            return self.objects.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def get_many(self, pks):
+        """Словарь найденных объектов по переданным id."""
+        objects = self.objects
+        found = {}
+        for pk in pks:
+            try:
+                obj = objects.get(int(pk))
+            except (TypeError, ValueError):
+                continue
+            if obj is not None:
+                found[obj.pk] = obj
+        return found
+
+    def resolve(self, pks):
+        """Как get_many, но при промахе сразу сверяет версию с базой.
+
+        Промах может означать, что объект добавлен в другом процессе и
+        справочник еще не успел это заметить. Справочник перечитывается,
+        только если версия в базе действительно изменилась.
+        """
+        pks = set(pks)
+        found = self.get_many(pks)
+        if len(found) < len(pks):
+            with self._lock:
+                self._checked_at = 0
+            found = self.get_many(pks)
+        return found
+
+    def all(self):
+        return list(self.objects.values())
+
+
+tags = Catalogue(Tag)
+ingredients = Catalogue(Ingredient)
+
+
+def tag_slug_choices():
+    return sorted((tag.slug, tag.name) for tag in tags.all())
+
+
+def tag_ids_by_slug(slugs):
+    slugs = set(slugs)
+    return [tag.pk for tag in tags.all() if tag.slug in slugs]
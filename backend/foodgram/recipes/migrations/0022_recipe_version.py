@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:55
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0021_alter_recipe_short_link'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, verbose_name='Версия'),
+        ),
+    ]
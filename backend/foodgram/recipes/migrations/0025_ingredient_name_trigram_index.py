@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx "
+    "ON recipes_ingredient "
+    "USING gin ((replace(lower(name), 'ё', 'е')) gin_trgm_ops)"
+)
+
+
+def create_trigram_index(apps, schema_editor):
+    # Индекс нужен только PostgreSQL, в SQLite поиск идет по индексу в памяти.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(INDEX_SQL)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0024_modified_timestamps'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Индекс (tag_id, recipe_id) для фильтра рецептов по тегам.
+
+    Автоматическая промежуточная таблица Recipe.tags не поддерживает
+    Meta.indexes, поэтому индекс создается SQL-запросом.
+    """
+
+    dependencies = [
+        ('recipes', '0025_ingredient_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX IF EXISTS recipe_tags_tag_recipe_idx',
+        ),
+    ]
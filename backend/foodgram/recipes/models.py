@@ -1,10 +1,13 @@
+import uuid
+
 import shortuuid
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-from foodgram.constants import (MAX_NAME, MAX_TAG_LENGTH, MAX_TEXT_DESCRIPTION,
-                                MAX_UNIT_LENGTH)
+from foodgram.constants import (MAX_INGREDIENT_AMOUNT, MAX_NAME,
+                                MAX_TAG_LENGTH, MAX_TEXT_DESCRIPTION,
+                                MAX_UNIT_LENGTH, MIN_INGREDIENT_AMOUNT)
 
 from .validators import HexColorValidator
 
@@ -30,6 +33,11 @@ class Tag(models.Model):
         default='#FFFFFF',
         db_index=False
     )
+    modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
 
     def __str__(self) -> str:
         return self.name
@@ -49,6 +57,18 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
         max_length=MAX_UNIT_LENGTH
     )
+    modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+
+    class Meta:
+        indexes = (
+            # Поиск ингредиента по паре название-единица при загрузке данных.
+            models.Index(fields=('name', 'measurement_unit'),
+                         name='ingredient_name_unit_idx'),
+        )
 
     def __str__(self) -> str:
         return self.name
@@ -101,27 +121,44 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    modified = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True,
+    )
 
     short_link = models.CharField(max_length=128, unique=True,
                                   default=shortuuid.ShortUUID().random())
 
+    version = models.UUIDField(
+        verbose_name='Версия',
+        default=uuid.uuid4,
+        editable=False,
+    )
+
     def save(self, *args, **kwargs):
         created = self.pk
         if created is None:
             random_string = shortuuid.ShortUUID().random()
             self.short_link = random_string
+        self.version = uuid.uuid4()
         super(Recipe, self).save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
-        ordering = ("-pub_date",)
+        ordering = ("-pub_date", "-id")
         constraints = (
             models.UniqueConstraint(
                 fields=("name", "author"),
                 name="unique_for_author",
             ),
         )
+        indexes = (
+            models.Index(fields=("-pub_date", "-id"),
+                         name="recipe_pub_date_id_idx"),
+            models.Index(fields=("author", "-pub_date", "-id"),
+                         name="recipe_author_pub_date_id_idx"),
+        )
 
     def __str__(self) -> str:
         return self.name
@@ -136,10 +173,13 @@ class IngredientPerRecipe(models.Model):
     recipe = models.ForeignKey(
         to=Recipe,
         verbose_name='Рецепт',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Покрыт индексом ingredient_recipe_recipe_idx.
+        db_index=False,
     )
     amount = models.PositiveSmallIntegerField(
-        validators=(MaxValueValidator(10000), MinValueValidator(1)),
+        validators=(MaxValueValidator(MAX_INGREDIENT_AMOUNT),
+                    MinValueValidator(MIN_INGREDIENT_AMOUNT)),
         verbose_name='Количество',
         default=1,
         blank=False
@@ -153,6 +193,12 @@ class IngredientPerRecipe(models.Model):
                 fields=['ingredient', 'recipe'],
                 name='ingredient_recipe_unique')
         ]
+        indexes = (
+            # Ингредиенты рецепта и суммирование списка покупок
+            # читаются по recipe_id, уникальность начинается с ingredient.
+            models.Index(fields=('recipe', 'ingredient'),
+                         name='ingredient_recipe_recipe_idx'),
+        )
         default_related_name = 'ingredient_recipes'
 
     def __str__(self) -> str:
@@ -170,6 +216,8 @@ class UserRelatedConditionOfRecipe(models.Model):
         to=Recipe,
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
+        # Покрыт составным индексом (recipe, user) наследника.
+        db_index=False,
     )
 
     class Meta:
@@ -188,6 +236,11 @@ class FavoriteRecipe(UserRelatedConditionOfRecipe):
                 fields=['user', 'recipe'],
                 name='user_recipe_unique')
         ]
+        indexes = (
+            # Подсчет и удаление отметок по рецепту.
+            models.Index(fields=('recipe', 'user'),
+                         name='favorite_recipe_user_idx'),
+        )
 
 
 class ShopingCart(UserRelatedConditionOfRecipe):
@@ -196,7 +249,8 @@ class ShopingCart(UserRelatedConditionOfRecipe):
         to=Recipe,
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
-        related_name='in_cart'
+        related_name='in_cart',
+        db_index=False,
     )
 
     class Meta:
@@ -211,3 +265,47 @@ class ShopingCart(UserRelatedConditionOfRecipe):
                 name="recipe_in_cart_already",
             ),
         )
+        indexes = (
+            models.Index(fields=("recipe", "user"),
+                         name="cart_recipe_user_idx"),
+        )
+
+
+class ShoppingListItem(models.Model):
+    """Итог по ингредиенту в списке покупок пользователя.
+
+    Производная таблица: пересчитывается сигналами корзины и строк
+    ингредиентов рецептов, см. recipes.shopping_list. После массовых
+    изменений в обход сигналов ее нужно собрать заново командой
+    rebuild_shopping_lists.
+    """
+
+    user = models.ForeignKey(
+        to=User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        # Покрыт уникальностью (user, ingredient).
+        db_index=False,
+    )
+    ingredient = models.ForeignKey(
+        to=Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Строки списка покупок"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="shopping_list_user_ingredient_unique",
+            ),
+        )
+        default_related_name = 'shopping_list_items'
+
+    def __str__(self) -> str:
+        return f'{self.ingredient.name} for {self.user.username}'
@@ -0,0 +1,131 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import IngredientPerRecipe, ShopingCart, ShoppingListItem
+
+User = get_user_model()
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def lock_users(user_ids):
+    """Блокирует строки пользователей до конца транзакции.
+
+    Еще не созданные строки списка покупок заблокировать нельзя,
+    поэтому параллельные изменения списка одного пользователя
+    выполняются по очереди через блокировку самого пользователя.
+    Порядок по id исключает взаимоблокировки.
+    """
+    list(User.objects.select_for_update().filter(pk__in=user_ids)
+         .order_by('pk').values_list('pk', flat=True))
+
+
+def apply(changes):
+    """Прибавляет изменения к итогам списков покупок.
+
+    changes — словарь (id пользователя, id ингредиента) -> изменение
+    количества. Строки с нулевым итогом удаляются.
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    user_ids = {user_id for user_id, _ in changes}
+    with transaction.atomic():
+        lock_users(user_ids)
+        rows = {
+            (row.user_id, row.ingredient_id): row
+            for row in ShoppingListItem.objects.filter(
+                user_id__in=user_ids,
+                ingredient_id__in={ingredient_id
+                                   for _, ingredient_id in changes},
+            )
+        }
+        created = []
+        changed = []
+        removed = []
+        for (user_id, ingredient_id), delta in changes.items():
+            row = rows.get((user_id, ingredient_id))
+            if row is None:
+                if delta > 0:
+                    created.append(ShoppingListItem(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        total_amount=delta))
+                continue
+            row.total_amount += delta
+            if row.total_amount > 0:
+                changed.append(row)
+            else:
+                removed.append(row.pk)
+        if removed:
+            ShoppingListItem.objects.filter(pk__in=removed).delete()
+        if changed:
+            ShoppingListItem.objects.bulk_update(changed, ['total_amount'])
+        ShoppingListItem.objects.bulk_create(created)
+
+
+def recipe_amounts(recipe_id):
+    return dict(IngredientPerRecipe.objects.filter(recipe_id=recipe_id)
+                .values_list('ingredient_id', 'amount'))
+
+
+def cart_changed(user_id, recipe_id, added):
+    """Учитывает рецепт, добавленный в корзину или убранный из нее."""
+    sign = 1 if added else -1
+    apply({(user_id, ingredient_id): sign * amount
+           for ingredient_id, amount in recipe_amounts(recipe_id).items()})
+
+
+def recipe_changed(recipe_id, deltas):
+    """Учитывает правку ингредиентов рецепта во всех корзинах с ним.
+
+    deltas — словарь id ингредиента -> изменение количества.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    user_ids = ShopingCart.objects.filter(
+        recipe_id=recipe_id).values_list('user_id', flat=True)
+    apply({(user_id, ingredient_id): delta
+           for user_id in user_ids
+           for ingredient_id, delta in deltas.items()})
+
+
+def amount_deltas(old, new):
+    """Разница между двумя наборами id ингредиента -> количество."""
+    deltas = Counter(new)
+    deltas.subtract(old)
+    return dict(deltas)
+
+
+def rebuild(user_ids=None):
+    """Пересчитывает списки покупок с нуля по корзинам.
+
+    Без user_ids пересчитываются списки всех пользователей.
+    Возвращает число записанных строк.
+    """
+    carts = ShopingCart.objects.filter(
+        recipe__ingredient_recipes__isnull=False)
+    rows = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+        rows = rows.filter(user_id__in=user_ids)
+    totals = (
+        carts.values('user_id', 'recipe__ingredient_recipes__ingredient_id')
+        .annotate(total_amount=Sum('recipe__ingredient_recipes__amount'))
+        .order_by()
+    )
+    with transaction.atomic():
+        if user_ids is not None:
+            lock_users(user_ids)
+        rows.delete()
+        return len(ShoppingListItem.objects.bulk_create(
+            [ShoppingListItem(
+                user_id=row['user_id'],
+                ingredient_id=row['recipe__ingredient_recipes__ingredient_id'],
+                total_amount=row['total_amount'])
+             for row in totals],
+            batch_size=REBUILD_BATCH_SIZE,
+        ))
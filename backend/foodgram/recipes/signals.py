@@ -0,0 +1,150 @@
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalogue, shopping_list, snapshots
+from .models import (Ingredient, IngredientPerRecipe, Recipe, ShopingCart,
+                     Tag)
+
+User = get_user_model()
+
+
+def bump_recipe_versions(recipes):
+    """Меняет версию рецептов, чтобы сбросить их закэшированные данные."""
+    recipes.update(version=uuid.uuid4(), modified=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, model,
+                             pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_recipe_versions(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set:
+        bump_recipe_versions(Recipe.objects.filter(pk__in=pk_set))
+    else:
+        # Очистка со стороны тега или ингредиента: pk_set не передается.
+        related = {Tag: 'tags', Ingredient: 'ingredients'}[type(instance)]
+        bump_recipe_versions(Recipe.objects.filter(**{related: instance}))
+    if sender is Recipe.ingredients.through and action == 'post_add':
+        ingredients_added(instance, reverse, pk_set)
+
+
+def ingredients_added(instance, reverse, pk_set):
+    """Учитывает строки, добавленные через recipe.ingredients.add().
+
+    add() и set() пишут их через bulk_create без post_save, а удаление
+    через remove(), clear() и set() отправляет post_delete каждой строки.
+    """
+    if reverse:
+        rows = IngredientPerRecipe.objects.filter(ingredient=instance,
+                                                  recipe_id__in=pk_set)
+    else:
+        rows = IngredientPerRecipe.objects.filter(recipe=instance,
+                                                  ingredient_id__in=pk_set)
+    deltas = defaultdict(dict)
+    for recipe_id, ingredient_id, amount in rows.values_list(
+            'recipe_id', 'ingredient_id', 'amount'):
+        deltas[recipe_id][ingredient_id] = amount
+    for recipe_id, recipe_deltas in deltas.items():
+        shopping_list.recipe_changed(recipe_id, recipe_deltas)
+
+
+@receiver(post_save, sender=IngredientPerRecipe)
+@receiver(post_delete, sender=IngredientPerRecipe)
+def ingredient_amount_changed(sender, instance, **kwargs):
+    bump_recipe_versions(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        bump_recipe_versions(Recipe.objects.filter(tags=instance))
+
+
+# Связи с удаляемым тегом удаляются каскадом без сигнала m2m_changed.
+pre_delete.connect(tag_changed, sender=Tag)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_recipe_versions(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    bump_recipe_versions(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_catalogue_changed(sender, **kwargs):
+    catalogue.tags.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_catalogue_changed(sender, **kwargs):
+    catalogue.ingredients.invalidate()
+    snapshots.ingredients_changed()
+
+
+@receiver(post_save, sender=ShopingCart)
+def recipe_added_to_cart(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.cart_changed(instance.user_id, instance.recipe_id,
+                                   added=True)
+
+
+# pre_delete, а не post_delete: при удалении рецепта сигналы для всех
+# удаляемых каскадом строк отправляются до удаления, и ингредиенты
+# рецепта еще можно прочитать.
+@receiver(pre_delete, sender=ShopingCart)
+def recipe_removed_from_cart(sender, instance, **kwargs):
+    shopping_list.cart_changed(instance.user_id, instance.recipe_id,
+                               added=False)
+
+
+@receiver(pre_save, sender=IngredientPerRecipe)
+def remember_ingredient_amount(sender, instance, raw=False, **kwargs):
+    # Старая строка нужна, чтобы поправить списки покупок на разницу.
+    instance._saved_row = None
+    if not raw and not instance._state.adding:
+        instance._saved_row = (
+            IngredientPerRecipe.objects.filter(pk=instance.pk)
+            .values_list('recipe_id', 'ingredient_id', 'amount').first()
+        )
+
+
+@receiver(post_save, sender=IngredientPerRecipe)
+def ingredient_amount_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = defaultdict(lambda: defaultdict(int))
+    deltas[instance.recipe_id][instance.ingredient_id] += instance.amount
+    old = getattr(instance, '_saved_row', None)
+    if old is not None:
+        recipe_id, ingredient_id, amount = old
+        deltas[recipe_id][ingredient_id] -= amount
+    for recipe_id, recipe_deltas in deltas.items():
+        shopping_list.recipe_changed(recipe_id, recipe_deltas)
+
+
+@receiver(post_delete, sender=IngredientPerRecipe)
+def ingredient_amount_deleted(sender, instance, origin, **kwargs):
+    # При каскадном удалении рецепта списки покупок поправляет сигнал
+    # корзины, а строки удаляемого ингредиента удаляются вместе с ним.
+    if getattr(origin, 'model', type(origin)) is not IngredientPerRecipe:
+        return
+    shopping_list.recipe_changed(instance.recipe_id,
+                                 {instance.ingredient_id: -instance.amount})
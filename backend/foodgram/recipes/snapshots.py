@@ -0,0 +1,132 @@
+import gzip
+import json
+import os
+from hashlib import sha256
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Ingredient
+
+SNAPSHOT_DIR = 'catalogue'
+INGREDIENTS = 'ingredients'
+# Сколько прошлых версий оставлять для клиентов, получивших старую ссылку.
+KEEP_VERSIONS = 2
+
+ENCODINGS = (
+    ('gzip', '.gz'),
+)
+
+
+def snapshot_root():
+    return os.path.join(settings.MEDIA_ROOT, SNAPSHOT_DIR)
+
+
+def snapshot_url(filename):
+    return f'{settings.MEDIA_URL}{SNAPSHOT_DIR}/{filename}'
+
+
+def compress(content):
+    return {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+
+
+def write_atomic(path, content):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def write_ingredients_snapshot():
+    """Записывает справочник ингредиентов в JSON и .gz.
+
+    Имя файла содержит хэш содержимого, поэтому nginx может отдавать его
+    с бессрочным кэшированием. Файл ingredients.current.json указывает
+    на текущую версию и хранит состояние таблицы, по которому API
+    проверяет, что снимок не устарел.
+    """
+    state = Ingredient.objects.aggregate(modified=Max('modified'),
+                                         count=Count('id'))
+    rows = list(Ingredient.objects.order_by('id')
+                .values('id', 'name', 'measurement_unit'))
+    content = json.dumps(rows, ensure_ascii=False,
+                         separators=(',', ':')).encode('utf-8')
+    version = sha256(content).hexdigest()[:16]
+    filename = f'{INGREDIENTS}.{version}.json'
+    root = snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, filename)
+    write_atomic(path, content)
+    for suffix, compressed in compress(content).items():
+        write_atomic(path + suffix, compressed)
+    pointer = {
+        'version': version,
+        'filename': filename,
+        'count': state['count'],
+        'modified': state['modified'] and state['modified'].isoformat(),
+    }
+    write_atomic(os.path.join(root, f'{INGREDIENTS}.current.json'),
+                 json.dumps(pointer).encode('utf-8'))
+    remove_old_snapshots(root, filename)
+    return pointer
+
+
+def remove_old_snapshots(root, current):
+    snapshots = sorted(
+        (entry for entry in os.scandir(root)
+         if entry.name.startswith(f'{INGREDIENTS}.')
+         and entry.name.endswith('.json')
+         and entry.name not in (current, f'{INGREDIENTS}.current.json')),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in snapshots[KEEP_VERSIONS - 1:]:
+        for suffix in ('', *(suffix for _, suffix in ENCODINGS)):
+            try:
+                os.remove(entry.path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def current_ingredients_snapshot():
+    """Указатель на текущий снимок или None, если его еще нет."""
+    try:
+        with open(os.path.join(snapshot_root(),
+                               f'{INGREDIENTS}.current.json'),
+                  encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def accepted_encodings(accept_encoding):
+    """Кодировки снимка, которые принимает клиент, в порядке выбора."""
+    accepted = {part.split(';')[0].strip()
+                for part in accept_encoding.split(',')}
+    return tuple(encoding for encoding, _ in ENCODINGS
+                 if encoding in accepted)
+
+
+def open_snapshot(pointer, accept_encoding):
+    """Файл снимка в лучшей поддерживаемой клиентом кодировке.
+
+    Возвращает (открытый файл, Content-Encoding или None) либо
+    (None, None), если файл уже удален.
+    """
+    path = os.path.join(snapshot_root(), pointer['filename'])
+    suffixes = dict(ENCODINGS)
+    for encoding in accepted_encodings(accept_encoding):
+        try:
+            return open(path + suffixes[encoding], 'rb'), encoding
+        except FileNotFoundError:
+            continue
+    try:
+        return open(path, 'rb'), None
+    except FileNotFoundError:
+        return None, None
+
+
+def ingredients_changed():
+    """Перезаписывает снимок после фиксации транзакции с правкой."""
+    transaction.on_commit(write_ingredients_snapshot)
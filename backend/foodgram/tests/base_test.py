@@ -1,5 +1,10 @@
+import shutil
+import tempfile
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes import catalogue
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
@@ -11,6 +16,17 @@ class BaseTestCase(TestCase):
     Provide prearranged Authorized and Anonymous Test Clients.
     Use this class in purpose to follow DRY concept.
     '''
+    @classmethod
+    def setUpClass(cls):
+        # Uploaded images and catalogue snapshots go to a throwaway
+        # MEDIA_ROOT instead of the project's media directory.
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+        super().setUpClass()
+
     @classmethod
     def setUpTestData(cls):
         cls.unauth_client = APIClient()
@@ -24,3 +40,10 @@ class BaseTestCase(TestCase):
         token = Token.objects.create(user=cls.user_authenticated_1)
         cls.auth_client_1.credentials(
             HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def _pre_setup(self):
+        # Cached counts, recipes and catalogues must not leak between tests.
+        super()._pre_setup()
+        cache.clear()
+        catalogue.tags.invalidate()
+        catalogue.ingredients.invalidate()
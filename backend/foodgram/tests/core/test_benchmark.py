@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase, override_settings
+from recipes.models import Ingredient, IngredientPerRecipe, Recipe, Tag
+
+UserModel = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MIDDLEWARE=['core.middleware.QueryCountMiddleware', *settings.MIDDLEWARE],
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class BenchmarkCommandTestCase(LiveServerTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = UserModel.objects.create_user(
+            username='bench', password='password', first_name='bench',
+            last_name='bench', email='bench@gmail.com')
+        tag = Tag.objects.create(name='breakfast', slug='breakfast')
+        ingredient = Ingredient.objects.create(name='carrot',
+                                               measurement_unit='g')
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=self.user, name=f'recipe{number}', text='text',
+                cooking_time=10)
+            recipe.tags.add(tag)
+            IngredientPerRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10)
+
+    def test_benchmark_reports_every_scenario_endpoint(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'result.json')
+
+            # Act
+            call_command('benchmark', base_url=self.live_server_url,
+                         email='bench@gmail.com', password='password',
+                         concurrency=1, duration=2, output=output,
+                         stdout=StringIO())
+            with open(output, encoding='utf-8') as file:
+                report = json.load(file)
+
+        # Assert
+        self.assertGreater(report['requests'], 0)
+        self.assertIn('GET /api/recipes/', report['endpoints'])
+        for key, endpoint in report['endpoints'].items():
+            with self.subTest(endpoint=key):
+                self.assertLessEqual(endpoint['p50_ms'], endpoint['p99_ms'])
+                self.assertIsNotNone(endpoint['queries_per_request'],
+                                     'Query count header should be read')
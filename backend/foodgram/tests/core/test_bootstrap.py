@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient
+
+STATIC_DIR = tempfile.mkdtemp()
+STATIC_ROOT = tempfile.mkdtemp()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+PHASES = ('migrate', 'seed', 'catalogue snapshot', 'collectstatic')
+
+
+@override_settings(STATICFILES_DIRS=[STATIC_DIR], STATIC_ROOT=STATIC_ROOT,
+                   MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch.dict(os.environ, {'DEFAULT_SU_NAME': ''})
+class BootstrapCommandTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for directory in (STATIC_DIR, STATIC_ROOT, MEDIA_ROOT):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def setUp(self):
+        with open(os.path.join(STATIC_DIR, 'app.css'), 'w') as file:
+            file.write('body {}')
+
+    def bootstrap(self, **options):
+        output = StringIO()
+        call_command('bootstrap', stdout=output, **options)
+        return output.getvalue()
+
+    def test_first_run_executes_every_phase(self):
+        # Act
+        output = self.bootstrap()
+
+        # Assert
+        for phase in PHASES:
+            with self.subTest(phase=phase):
+                self.assertIn(f'{phase}: done in', output)
+        self.assertIn('superuser: not configured, skipped', output)
+        self.assertEqual(Ingredient.objects.count(), 2186)
+        self.assertTrue(os.path.exists(os.path.join(STATIC_ROOT, 'app.css')))
+
+    def test_unchanged_inputs_are_skipped(self):
+        # Arrange
+        self.bootstrap()
+
+        # Act
+        with CaptureQueriesContext(connection) as context:
+            output = self.bootstrap()
+
+        # Assert
+        for phase in PHASES:
+            with self.subTest(phase=phase):
+                self.assertIn(f'{phase}: unchanged, skipped', output)
+        self.assertLessEqual(len(context.captured_queries), 3,
+                             'Skipped phases should only read fingerprints')
+
+    def test_changed_static_files_are_collected_again(self):
+        # Arrange
+        self.bootstrap()
+        path = os.path.join(STATIC_DIR, 'app.css')
+        with open(path, 'w') as file:
+            file.write('body { color: black }')
+        # collectstatic copies only files newer than the collected copy.
+        modified = os.path.getmtime(path) + 10
+        os.utime(path, (modified, modified))
+
+        # Act
+        output = self.bootstrap()
+
+        # Assert
+        self.assertIn('collectstatic: done in', output)
+        self.assertIn('migrate: unchanged, skipped', output)
+        with open(os.path.join(STATIC_ROOT, 'app.css')) as file:
+            self.assertEqual(file.read(), 'body { color: black }')
+
+    def test_force_runs_unchanged_phases(self):
+        # Arrange
+        self.bootstrap()
+
+        # Act
+        output = self.bootstrap(force=True)
+
+        # Assert
+        for phase in PHASES:
+            with self.subTest(phase=phase):
+                self.assertIn(f'{phase}: done in', output)
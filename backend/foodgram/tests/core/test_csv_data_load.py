@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, IngredientPerRecipe, Recipe, Tag
+
+UserModel = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CsvDataLoadTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, filename, content):
+        with open(os.path.join(self.directory, filename), 'w',
+                  encoding='utf-8') as file:
+            file.write(content)
+
+    def load(self, **options):
+        output = StringIO()
+        call_command('csv_data_load', stdout=output, **options)
+        return output.getvalue()
+
+    def test_filling_data_is_loaded_once(self):
+        # Act
+        self.load()
+        with CaptureQueriesContext(connection) as context:
+            output = self.load()
+
+        # Assert
+        self.assertEqual(UserModel.objects.count(), 3)
+        self.assertEqual(Ingredient.objects.count(), 2186)
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertEqual(Recipe.objects.count(), 10)
+        self.assertTrue(Tag.objects.filter(slug='drinks').exists(),
+                        'Values should be stripped of spaces')
+        self.assertFalse(Recipe.objects.filter(image='').exists(),
+                         'Every recipe should get its image')
+        self.assertFalse(Recipe.objects.filter(tags__isnull=True).exists())
+        self.assertTrue(IngredientPerRecipe.objects.filter(
+            recipe_id=1, ingredient_id=2).exists(),
+            'recipes_ingredients.csv should be loaded')
+        self.assertEqual(output.count('unchanged, skipped'), 5, output)
+        self.assertLessEqual(len(context.captured_queries), 5,
+                             'Unchanged files should cost one query each')
+
+    def test_json_and_ndjson_sources(self):
+        # Arrange
+        self.write('ingredients.json', json.dumps([
+            {'name': 'морковь', 'measurement_unit': 'г'},
+            {'name': 'молоко', 'measurement_unit': 'мл'},
+        ], ensure_ascii=False))
+        self.write('tags.ndjson',
+                   '{"name": "завтрак", "slug": "breakfast"}\n\n'
+                   '{"name": "обед", "slug": "lunch"}\n')
+
+        # Act
+        self.load(path=self.directory)
+
+        # Assert
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {('морковь', 'г'), ('молоко', 'мл')})
+        self.assertEqual(set(Tag.objects.values_list('name', 'slug')),
+                         {('завтрак', 'breakfast'), ('обед', 'lunch')})
+
+    def test_changed_file_is_upserted(self):
+        # Arrange
+        self.write('tags.csv', 'завтрак,breakfast\nобед,lunch\n')
+        self.write('ingredients.csv', 'морковь,г\n')
+        self.load(path=self.directory)
+        tag_ids = set(Tag.objects.values_list('id', flat=True))
+        self.write('tags.csv', 'завтрак,morning\nобед,lunch\nужин,dinner\n')
+
+        # Act
+        output = self.load(path=self.directory)
+
+        # Assert
+        self.assertIn('ingredients: unchanged, skipped', output)
+        self.assertIn('tags: 3 rows', output)
+        self.assertEqual(Tag.objects.get(name='завтрак').slug, 'morning')
+        self.assertTrue(tag_ids < set(Tag.objects.values_list('id',
+                                                              flat=True)),
+                        'Existing tags should be updated in place')
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_force_reloads_unchanged_files(self):
+        # Arrange
+        self.write('ingredients.csv', 'морковь,г\nмолоко,мл\n')
+        self.load(path=self.directory)
+
+        # Act
+        output = self.load(path=self.directory, force=True)
+
+        # Assert
+        self.assertIn('ingredients: 2 rows', output)
+        self.assertEqual(Ingredient.objects.count(), 2,
+                         'Reloading should not duplicate ingredients')
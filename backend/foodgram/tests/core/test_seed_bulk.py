@@ -0,0 +1,30 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientPerRecipe,
+                            Recipe, ShopingCart)
+from users.models import Subscription
+
+
+class SeedBulkCommandTestCase(TestCase):
+    def test_seed_bulk_creates_requested_scale(self):
+        # Act
+        call_command('seed_bulk', users=20, recipes=50, favorites=100,
+                     carts=40, subscriptions=60, batch_size=16,
+                     stdout=StringIO())
+
+        # Assert
+        self.assertEqual(Ingredient.objects.count(), 2186,
+                         'Ingredient catalogue should be loaded from csv')
+        self.assertEqual(Recipe.objects.count(), 50)
+        self.assertFalse(
+            Recipe.objects.filter(ingredient_recipes__isnull=True).exists(),
+            'Every recipe should have ingredients')
+        self.assertFalse(
+            Recipe.objects.filter(tags__isnull=True).exists(),
+            'Every recipe should have tags')
+        self.assertGreater(IngredientPerRecipe.objects.count(), 50)
+        for model in (FavoriteRecipe, ShopingCart, Subscription):
+            with self.subTest(model=model):
+                self.assertGreater(model.objects.count(), 0)
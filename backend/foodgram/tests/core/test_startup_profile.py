@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+PROFILE = 'core.management.commands.startup_profile.profile_imports'
+ROWS = [
+    ('django.db', 3000, 3000, 1),
+    ('django', 1000, 4000, 0),
+    ('reportlab.pdfgen', 2000, 2000, 1),
+    ('api.utils', 500, 2500, 0),
+]
+
+
+class StartupProfileCommandTestCase(SimpleTestCase):
+    def test_application_startup_skips_heavy_modules(self):
+        '''Importing the application must not load reportlab or PIL.'''
+        # Arrange
+        output = StringIO()
+
+        # Act
+        call_command('startup_profile', budget=10 ** 6, stdout=output)
+
+        # Assert
+        self.assertIn('foodgram.urls', output.getvalue())
+        self.assertIn('Startup import budget met', output.getvalue())
+
+    def test_wsgi_import_does_not_touch_the_database(self):
+        '''Warm-up belongs to the gunicorn worker hook, not the import.'''
+        # Arrange
+        code = ('import foodgram.wsgi\n'
+                'from django.db import connection\n'
+                'print(connection.connection is None)\n')
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='foodgram.settings')
+
+        # Act
+        result = subprocess.run([sys.executable, '-c', code],
+                                capture_output=True, text=True, env=env)
+
+        # Assert
+        self.assertEqual(result.stdout.strip(), 'True', result.stderr)
+
+    def test_report_groups_time_by_package(self):
+        # Arrange
+        output = StringIO()
+
+        # Act
+        with mock.patch(PROFILE, return_value=ROWS):
+            call_command('startup_profile', budget=100, deny=['PIL'],
+                         stdout=output)
+
+        # Assert
+        report = output.getvalue()
+        self.assertIn('4.0  django', report)
+        self.assertIn('Total: 6.5 ms, 4 modules', report)
+
+    def test_failures(self):
+        test_cases = [
+            ({'budget': 5}, 'exceeds the budget of 5 ms'),
+            ({'budget': 100}, 'imported at startup: reportlab.pdfgen'),
+        ]
+        for options, message in test_cases:
+            with self.subTest(options=options):
+                with mock.patch(PROFILE, return_value=ROWS):
+                    with self.assertRaisesMessage(CommandError, message):
+                        call_command('startup_profile', stdout=StringIO(),
+                                     **options)
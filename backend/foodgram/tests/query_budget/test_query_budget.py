@@ -0,0 +1,188 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import catalogue
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientPerRecipe,
+                            Recipe, ShopingCart, Tag)
+from tests.base_test import BaseTestCase
+from users.models import Subscription
+
+UserModel = get_user_model()
+
+
+class SeededAPITestCase(BaseTestCase):
+    '''Several pages of recipes with tags, ingredients and user marks.'''
+    AUTHORS_COUNT = 8
+    RECIPES_PER_AUTHOR = 3
+    INGREDIENTS_PER_RECIPE = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tags = Tag.objects.bulk_create(
+            [Tag(name=f'tag{i}', slug=f'tag{i}') for i in range(3)]
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(name=f'ingredient{i}', measurement_unit='g')
+             for i in range(10)]
+        )
+        cls.authors = [
+            UserModel.objects.create_user(
+                username=f'author_{i}', password='password',
+                first_name='author', last_name='author',
+                email=f'author{i}@gmail.com')
+            for i in range(cls.AUTHORS_COUNT)
+        ]
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(author=author, name=f'{author.username}_recipe{i}',
+                    text='text', cooking_time=10,
+                    short_link=f'{author.username}_{i}')
+             for author in cls.authors
+             for i in range(cls.RECIPES_PER_AUTHOR)]
+        )
+        tag_links = []
+        ingredient_links = []
+        for number, recipe in enumerate(recipes):
+            tag_links += [
+                Recipe.tags.through(recipe=recipe, tag=tag)
+                for tag in (cls.tags[number % 3], cls.tags[(number + 1) % 3])
+            ]
+            ingredient_links += [
+                IngredientPerRecipe(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[(number + i) % 10],
+                    amount=i + 1)
+                for i in range(cls.INGREDIENTS_PER_RECIPE)
+            ]
+        Recipe.tags.through.objects.bulk_create(tag_links)
+        IngredientPerRecipe.objects.bulk_create(ingredient_links)
+        user = cls.user_authenticated_1
+        FavoriteRecipe.objects.bulk_create(
+            [FavoriteRecipe(user=user, recipe=recipe)
+             for recipe in recipes[::2]]
+        )
+        ShopingCart.objects.bulk_create(
+            [ShopingCart(user=user, recipe=recipe)
+             for recipe in recipes[1::2]]
+        )
+        Subscription.objects.bulk_create(
+            [Subscription(user=user, target_user=author)
+             for author in cls.authors]
+        )
+        cls.recipe = recipes[0]
+
+
+class QueryBudgetTestCase(SeededAPITestCase):
+    '''
+    Check that every public endpoint runs a fixed number of SQL queries
+    regardless of the page size.
+    '''
+    SMALL_PAGE = 2
+    LARGE_PAGE = 12
+
+    def setUp(self):
+        # Tag and ingredient catalogues are measured in the steady state:
+        # loaded once and not rechecked against the database.
+        for catalogue_cache in (catalogue.tags, catalogue.ingredients):
+            patcher = mock.patch.object(catalogue_cache, 'check_interval',
+                                        3600)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+            catalogue_cache.get(0)
+
+    def count_queries(self, client, url, warm_cache=False):
+        '''Count queries with a cold recipe fragment cache by default.'''
+        if warm_cache:
+            client.get(url)
+        else:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, client, url, budget, warm_cache=False):
+        '''Same budget for a small and a large page of the same list.'''
+        separator = '&' if '?' in url else '?'
+        for page_size in (self.SMALL_PAGE, self.LARGE_PAGE):
+            paged_url = f'{url}{separator}limit={page_size}'
+            with self.subTest(url=paged_url):
+                self.assertEqual(self.count_queries(client, paged_url,
+                                                    warm_cache),
+                                 budget,
+                                 f'Query count of {paged_url} changed')
+
+    def test_recipes_list(self):
+        # Arrange
+        test_cases = [
+            (self.unauth_client, '/api/recipes/', 4),
+            (self.auth_client_1, '/api/recipes/', 6),
+            (self.unauth_client, '/api/recipes/?tags=tag0&tags=tag1', 4),
+            (self.auth_client_1, '/api/recipes/?tags=tag0&tags=tag1', 6),
+            (self.auth_client_1,
+             f'/api/recipes/?author={self.authors[0].id}', 7),
+            (self.auth_client_1, '/api/recipes/?is_favorited=1', 6),
+            (self.auth_client_1, '/api/recipes/?is_in_shopping_cart=1', 6),
+            (self.auth_client_1,
+             '/api/recipes/?is_favorited=1&is_in_shopping_cart=0'
+             '&tags=tag2', 6),
+        ]
+        # Act & Assert
+        for client, url, budget in test_cases:
+            with self.subTest(client=client, url=url):
+                self.assertQueryBudget(client, url, budget)
+
+    def test_recipes_list_with_warm_cache(self):
+        '''Cached recipes and counts need only the page query.'''
+        test_cases = [
+            (self.unauth_client, 1),
+            (self.auth_client_1, 3),
+        ]
+        for client, budget in test_cases:
+            with self.subTest(client=client):
+                self.assertQueryBudget(client, '/api/recipes/', budget,
+                                       warm_cache=True)
+
+    def test_recipe_detail(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        test_cases = [
+            (self.unauth_client, 4),
+            (self.auth_client_1, 6),
+        ]
+        for client, budget in test_cases:
+            with self.subTest(client=client):
+                self.assertEqual(self.count_queries(client, url), budget)
+
+    def test_users_list(self):
+        test_cases = [
+            (self.unauth_client, 2),
+            (self.auth_client_1, 4),
+        ]
+        for client, budget in test_cases:
+            with self.subTest(client=client):
+                self.assertQueryBudget(client, '/api/users/', budget)
+
+    def test_subscriptions(self):
+        for url in ('/api/users/subscriptions/',
+                    '/api/users/subscriptions/?recipes_limit=1'):
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.auth_client_1, url, 5)
+
+    def test_ingredients_search(self):
+        test_cases = [
+            ('/api/ingredients/', 2),
+            ('/api/ingredients/?name=ingr', 1),
+        ]
+        for url, budget in test_cases:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(self.unauth_client, url), budget)
+
+    def test_download_shopping_cart(self):
+        self.assertEqual(
+            self.count_queries(self.auth_client_1,
+                               '/api/recipes/download_shopping_cart/'),
+            2)
@@ -0,0 +1,80 @@
+import json
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from tests.query_budget.test_query_budget import SeededAPITestCase
+
+# Таблицы, которые целиком читаются дешево: справочники и пользователи,
+# которых API листает в порядке первичного ключа.
+SMALL_TABLES = {'recipes_tag', 'recipes_ingredient', 'users_customuser'}
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def postgresql_full_scans(sql):
+    '''Relations read with Seq Scan even when seqscan is discouraged.'''
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        nodes += node.get('Plans', [])
+    return scans
+
+
+def sqlite_full_scans(sql):
+    '''Tables or aliases that SQLite scans without any index.'''
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    return [match.group(1) for match in map(SQLITE_FULL_SCAN.match, details)
+            if match and match.group(1) != 'subquery']
+
+
+class QueryPlanTestCase(SeededAPITestCase):
+    '''
+    EXPLAIN every query of the hot endpoints and fail when a large
+    table is read with a sequential scan instead of an index.
+    '''
+
+    def full_scans(self, sql):
+        if connection.vendor == 'postgresql':
+            scans = postgresql_full_scans(sql)
+        else:
+            scans = sqlite_full_scans(sql)
+        return [table for table in scans if table not in SMALL_TABLES]
+
+    def test_hot_queries_use_indexes(self):
+        # Arrange
+        test_cases = [
+            (self.unauth_client, '/api/recipes/'),
+            (self.auth_client_1, '/api/recipes/'),
+            (self.auth_client_1, '/api/recipes/?tags=tag0&tags=tag1'),
+            (self.auth_client_1,
+             f'/api/recipes/?author={self.authors[0].id}'),
+            (self.auth_client_1, '/api/recipes/?is_favorited=1'),
+            (self.auth_client_1, '/api/recipes/?is_in_shopping_cart=1'),
+            (self.auth_client_1, f'/api/recipes/{self.recipe.id}/'),
+            (self.auth_client_1, '/api/users/'),
+            (self.auth_client_1, '/api/users/subscriptions/'),
+            (self.auth_client_1, '/api/recipes/download_shopping_cart/'),
+        ]
+        # Act & Assert
+        for client, url in test_cases:
+            with CaptureQueriesContext(connection) as context:
+                client.get(url)
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                with self.subTest(url=url, sql=query['sql']):
+                    self.assertEqual(self.full_scans(query['sql']), [],
+                                     'Query reads a large table without '
+                                     'an index')
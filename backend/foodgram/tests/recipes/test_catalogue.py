@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import catalogue
+from recipes.models import Ingredient, Tag
+from tests.base_test import BaseTestCase
+
+
+class CatalogueTestCase(BaseTestCase):
+    '''Tags and ingredients are served from memory until they change.'''
+
+    def setUp(self):
+        self.tag = Tag.objects.create(name='breakfast', slug='breakfast')
+        self.ingredient = Ingredient.objects.create(name='carrot',
+                                                    measurement_unit='g')
+        self.recipe_data = {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 10}],
+            'tags': [self.tag.id],
+            'name': 'recipe',
+            'text': 'text',
+            'cooking_time': 10,
+            'image': ('data:image/png;base64,'
+                      'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVE'
+                      'UAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklE'
+                      'QVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=='),
+        }
+
+    def test_recipe_write_does_not_query_catalogue(self):
+        # Arrange
+        catalogue.tags.get(self.tag.id)
+        catalogue.ingredients.get(self.ingredient.id)
+
+        # Act
+        with CaptureQueriesContext(connection) as context:
+            response = self.auth_client_1.post('/api/recipes/',
+                                               self.recipe_data,
+                                               format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, 201, response.content)
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        for table in (Tag._meta.db_table, Ingredient._meta.db_table):
+            with self.subTest(table=table):
+                self.assertNotIn(f'FROM "{table}"', tables)
+
+    def test_catalogue_follows_writes(self):
+        # Arrange
+        self.assertEqual(catalogue.tags.get(self.tag.id).name, 'breakfast')
+        test_cases = [
+            ('tag renamed', self.rename_tag,
+             lambda: self.assertEqual(catalogue.tags.get(self.tag.id).name,
+                                      'renamed')),
+            ('tag added',
+             lambda: Tag.objects.create(name='dinner', slug='dinner'),
+             lambda: self.assertIn(('dinner', 'dinner'),
+                                   catalogue.tag_slug_choices())),
+            ('ingredient deleted', self.ingredient.delete,
+             lambda: self.assertEqual(catalogue.ingredients.all(), [])),
+        ]
+
+        # Act & Assert
+        for write_name, write, check in test_cases:
+            with self.subTest(write=write_name):
+                write()
+                check()
+
+    def test_unknown_ids_are_rejected(self):
+        for tag_id in (0, 'abc', None):
+            with self.subTest(tag_id=tag_id):
+                self.assertIsNone(catalogue.tags.get(tag_id))
+
+    def rename_tag(self):
+        self.tag.name = 'renamed'
+        self.tag.save()
@@ -0,0 +1,83 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import FavoriteRecipe, Ingredient, Recipe, Tag
+from tests.base_test import BaseTestCase
+
+
+class ConditionalGetTestCase(BaseTestCase):
+    def setUp(self):
+        self.tag = Tag.objects.create(name='breakfast', slug='breakfast')
+        Ingredient.objects.create(name='carrot', measurement_unit='g')
+        self.recipe = Recipe.objects.create(author=self.user_authenticated_1,
+                                            name='recipe1', text='text',
+                                            cooking_time=10)
+        self.recipe_url = f'/api/recipes/{self.recipe.id}/'
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(context.captured_queries)
+
+    def test_unchanged_resources_return_304_without_main_query(self):
+        test_cases = [
+            (self.client, '/api/tags/', 1),
+            (self.client, f'/api/tags/{self.tag.id}/', 1),
+            (self.client, '/api/ingredients/?name=car', 1),
+            (self.client, self.recipe_url, 1),
+            (self.auth_client_1, self.recipe_url, 2),
+        ]
+        for client, url, budget in test_cases:
+            with self.subTest(client=client, url=url):
+                response, queries = self.revalidate(client, url)
+
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(queries, budget)
+
+    def test_changed_resources_return_full_response(self):
+        # Arrange
+        etags = {url: self.auth_client_1.get(url)['ETag']
+                 for url in ('/api/tags/', self.recipe_url)}
+
+        # Act
+        Tag.objects.create(name='dinner', slug='dinner')
+        FavoriteRecipe.objects.create(user=self.user_authenticated_1,
+                                      recipe=self.recipe)
+
+        # Assert
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.auth_client_1.get(url,
+                                                  HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_recipe_last_modified_only_for_anonymous(self):
+        anonymous = self.client.get(self.recipe_url)
+        authenticated = self.auth_client_1.get(self.recipe_url)
+
+        self.assertIn('Last-Modified', anonymous)
+        self.assertNotIn('Last-Modified', authenticated)
+        self.assertIn('Authorization', authenticated['Vary'])
+
+    def test_personalised_recipe_is_not_shared_by_caches(self):
+        # Arrange
+        etag = self.auth_client_1.get(self.recipe_url)['ETag']
+
+        # Act
+        responses = {
+            'anonymous': self.client.get(self.recipe_url),
+            'authenticated': self.auth_client_1.get(self.recipe_url),
+            'not modified': self.auth_client_1.get(
+                self.recipe_url, HTTP_IF_NONE_MATCH=etag),
+        }
+
+        # Assert
+        for name, response in responses.items():
+            with self.subTest(name=name):
+                self.assertIn('Authorization', response['Vary'])
+        self.assertNotIn('private',
+                         responses['anonymous'].get('Cache-Control', ''))
+        for name in ('authenticated', 'not modified'):
+            with self.subTest(name=name):
+                self.assertIn('private', responses[name]['Cache-Control'])
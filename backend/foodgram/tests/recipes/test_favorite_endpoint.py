@@ -62,3 +62,27 @@ class FavouriteRecipeTestCase(BaseTestCase):
                     # Assert
                     self.assertEqual(response.status_code, expected_status,
                                      error_msg)
+
+    def test_recipes_list_marks_favorited_recipes(self):
+        # Arrange
+        other_recipe = Recipe.objects.create(
+            author=self.user_authenticated_1, name='recipe2',
+            cooking_time=10, short_link='qwerty2')
+        FavoriteRecipe.objects.create(recipe=self.recipe,
+                                      user=self.user_authenticated_1)
+        test_cases = [
+            (self.auth_client_1, {self.recipe.id: True,
+                                  other_recipe.id: False},
+             'Only favorited recipe should be marked as favorited'),
+            (self.client, {self.recipe.id: False, other_recipe.id: False},
+             'Anonymous should never see recipes as favorited'),
+        ]
+
+        # Act
+        for client, expected_flags, error_msg in test_cases:
+            with self.subTest(client=client, error_msg=error_msg):
+                response = client.get('/api/recipes/')
+                # Assert
+                flags = {recipe['id']: recipe['is_favorited']
+                         for recipe in response.json()['results']}
+                self.assertEqual(flags, expected_flags, error_msg)
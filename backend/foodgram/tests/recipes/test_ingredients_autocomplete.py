@@ -0,0 +1,135 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import autocomplete
+from recipes.models import Ingredient
+from tests.base_test import BaseTestCase
+
+from foodgram import gunicorn_config
+
+
+class IngredientAutocompleteTestCase(BaseTestCase):
+    '''Ingredient search by name prefix is served from memory.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit='g')
+             for name in ('Ёжевика', 'ежевичный джем', 'Яблоко',
+                          'яблочный сок', 'Морковь')]
+            + [Ingredient(name=f'соль {i}', measurement_unit='g')
+               for i in range(30)]
+            + [Ingredient(name=f'сахар {i}', measurement_unit='g')
+               for i in range(120)]
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/api/ingredients/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_prefix_search(self):
+        # Arrange
+        test_cases = [
+            ('name=ябл', ['Яблоко', 'яблочный сок']),
+            ('name=ЯБЛОЧ', ['яблочный сок']),
+            ('name=еже', ['Ёжевика', 'ежевичный джем']),
+            ('name=ёжевич', ['ежевичный джем']),
+            ('name=ябл&limit=1', ['Яблоко']),
+            ('name=кофе', []),
+        ]
+        # Act & Assert
+        for query, expected in test_cases:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+
+    def test_limit(self):
+        test_cases = [
+            ('name=соль', 30),
+            ('name=соль&limit=5', 5),
+            ('name=соль&limit=0', 30),
+            ('name=соль&limit=abc', 30),
+            ('name=соль&limit=1000', 30),
+        ]
+        for query, expected in test_cases:
+            with self.subTest(query=query):
+                self.assertEqual(len(self.search(query)), expected)
+
+    def test_limit_is_capped_only_when_requested(self):
+        test_cases = [
+            ('name=сахар', 120),
+            ('name=сахар&limit=1000', 100),
+        ]
+        for query, expected in test_cases:
+            with self.subTest(query=query):
+                self.assertEqual(len(self.search(query)), expected)
+
+    def test_search_follows_catalogue_changes(self):
+        # Arrange
+        self.search('name=мор')
+        # Act
+        Ingredient.objects.create(name='морская соль', measurement_unit='g')
+        # Assert
+        self.assertEqual(self.search('name=мор'),
+                         ['Морковь', 'морская соль'])
+
+    def test_worker_hook_builds_the_index(self):
+        # Act
+        gunicorn_config.post_worker_init(worker=None)
+        with CaptureQueriesContext(connection) as context:
+            found = autocomplete.ingredients.search('мор', 20)
+        # Assert
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual([obj.name for obj in found], ['Морковь'])
+
+    def test_repeated_search_uses_no_queries(self):
+        # Arrange
+        autocomplete.ingredients.search('ябл', 20)
+        # Act
+        with CaptureQueriesContext(connection) as context:
+            found = autocomplete.ingredients.search('ябл', 20)
+        # Assert
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual([obj.name for obj in found],
+                         ['Яблоко', 'яблочный сок'])
+
+
+class IngredientFuzzySearchTestCase(BaseTestCase):
+    '''Misspelled names still find ingredients with ?fuzzy=1.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit='g')
+             for name in ('Морковь', 'морковь по-корейски', 'Молоко',
+                          'Ёжевика', 'картофель')]
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/api/ingredients/?fuzzy=1&{query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_fuzzy_search(self):
+        # Arrange
+        test_cases = [
+            ('name=марковь', ['Морковь']),
+            ('name=картофиль', ['картофель']),
+            ('name=ежевика', ['Ёжевика']),
+            ('name=марковь&limit=1', ['Морковь']),
+            ('name=ананас', []),
+        ]
+        # Act & Assert
+        for query, expected in test_cases:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+
+    def test_prefix_search_is_exact(self):
+        response = self.client.get('/api/ingredients/?name=марковь')
+        self.assertEqual(response.json(), [])
+
+    def test_trigrams_match_pg_trgm(self):
+        # pg_trgm: SELECT show_trgm('cat') -> {"  c"," ca","at ",cat}
+        self.assertEqual(autocomplete.trigrams('Cat'),
+                         {'  c', ' ca', 'cat', 'at '})
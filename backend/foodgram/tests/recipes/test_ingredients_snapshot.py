@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from recipes import snapshots
+from recipes.models import Ingredient
+from tests.base_test import BaseTestCase
+
+
+class IngredientsSnapshotTestCase(BaseTestCase):
+    '''The full ingredient list is served from a precompressed snapshot.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+             for i in range(5)]
+        )
+
+    def setUp(self):
+        call_command('snapshot_catalogue', stdout=StringIO())
+        self.expected = list(
+            Ingredient.objects.order_by('id')
+            .values('id', 'name', 'measurement_unit')
+        )
+
+    def get(self, **headers):
+        response = self.client.get('/api/ingredients/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_snapshot_is_served(self):
+        # Arrange
+        test_cases = [
+            ('identity', None, lambda content: content),
+            ('gzip', 'gzip', gzip.decompress),
+            ('br, gzip', 'gzip', gzip.decompress),
+            ('br', None, lambda content: content),
+        ]
+        # Act & Assert
+        for accept, encoding, decompress in test_cases:
+            with self.subTest(accept=accept):
+                response, content = self.get(accept_encoding=accept)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertIn('/media/catalogue/ingredients.',
+                              response['Link'])
+                self.assertEqual(json.loads(decompress(content)),
+                                 self.expected)
+
+    def test_snapshot_is_written_to_test_media_root(self):
+        # Arrange
+        project_media = os.path.join(settings.BASE_DIR, 'media')
+
+        # Act
+        root = snapshots.snapshot_root()
+
+        # Assert
+        self.assertTrue(os.listdir(root))
+        self.assertFalse(os.path.abspath(root).startswith(project_media),
+                         'Tests must not write into the project media')
+
+    def test_each_encoding_has_its_own_etag(self):
+        # Arrange
+        identity, _ = self.get(accept_encoding='identity')
+        gzipped, _ = self.get(accept_encoding='gzip')
+
+        # Act
+        response = self.client.get('/api/ingredients/',
+                                   HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=identity['ETag'])
+
+        # Assert
+        self.assertNotEqual(identity['ETag'], gzipped['ETag'])
+        self.assertEqual(response.status_code, 200,
+                         'An identity ETag must not validate the gzip body')
+        self.assertEqual(response['ETag'], gzipped['ETag'])
+
+    def test_stale_snapshot_is_not_served(self):
+        # Arrange
+        Ingredient.objects.create(name='новый', measurement_unit='г')
+        # Act
+        response = self.client.get('/api/ingredients/')
+        # Assert
+        self.assertFalse(response.streaming)
+        self.assertIn('новый', [item['name'] for item in response.json()])
+
+    def test_snapshot_follows_ingredient_changes(self):
+        # Arrange
+        old_pointer = snapshots.current_ingredients_snapshot()
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='новый', measurement_unit='г')
+        # Assert
+        pointer = snapshots.current_ingredients_snapshot()
+        self.assertNotEqual(pointer['version'], old_pointer['version'])
+        response, content = self.get()
+        self.assertIn('новый',
+                      [item['name'] for item in json.loads(content)])
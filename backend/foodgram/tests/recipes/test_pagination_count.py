@@ -0,0 +1,57 @@
+from unittest import mock
+
+from recipes.models import Recipe
+from tests.base_test import BaseTestCase
+
+
+class PaginationCountTestCase(BaseTestCase):
+    URL = '/api/recipes/?limit=1'
+
+    def setUp(self):
+        for number in range(3):
+            Recipe.objects.create(author=self.user_authenticated_1,
+                                  name=f'recipe{number}', text='text',
+                                  cooking_time=10)
+
+    def test_exact_count_is_cached_per_filter_set(self):
+        # Arrange
+        first = self.client.get(self.URL).json()
+
+        # Act
+        Recipe.objects.create(author=self.user_authenticated_1,
+                              name='fresh', text='text', cooking_time=10)
+        cached = self.client.get(self.URL).json()
+        filtered = self.client.get(
+            f'{self.URL}&author={self.user_authenticated_1.id}').json()
+
+        # Assert
+        self.assertEqual(first['count'], 3)
+        self.assertNotIn('count_is_exact', first,
+                         'Exact counts should keep the documented envelope')
+        self.assertEqual(cached['count'], 3,
+                         'Count should be served from cache')
+        self.assertEqual(filtered['count'], 4,
+                         'Other filters should have their own count')
+
+    def test_users_share_the_count_for_the_same_filters(self):
+        # Arrange
+        self.auth_client_1.get(self.URL)
+
+        # Act
+        Recipe.objects.create(author=self.user_authenticated_1,
+                              name='fresh', text='text', cooking_time=10)
+        anonymous = self.client.get(self.URL).json()
+        authenticated = self.auth_client_1.get(self.URL).json()
+
+        # Assert
+        self.assertEqual((anonymous['count'], authenticated['count']),
+                         (3, 3),
+                         'Per-user annotations should not split the cache')
+
+    def test_large_lists_use_planner_estimate(self):
+        with mock.patch('api.paginators.estimate_count',
+                        return_value=50000):
+            response = self.client.get(self.URL).json()
+
+        self.assertEqual(response['count'], 50000)
+        self.assertFalse(response['count_is_exact'])
@@ -0,0 +1,144 @@
+import json
+import os
+from unittest import mock
+
+from api import images
+from django.conf import settings
+from recipes.models import Ingredient, Recipe, Tag
+from tests.base_test import BaseTestCase
+from tests.recipes.test_recipe_validation import IMAGE
+
+BATCH_URL = '/api/recipes/batch/'
+
+
+class RunNow:
+    '''Executor stand-in that saves images right away.'''
+
+    def submit(self, function, images_data):
+        images.save_recipe_images(images_data)
+
+
+class RecipeBatchImportTestCase(BaseTestCase):
+    '''Partners import many recipes in one request.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tag = Tag.objects.create(name='breakfast', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(name='carrot',
+                                                   measurement_unit='g')
+
+    def setUp(self):
+        patcher = mock.patch.object(images, 'executor', RunNow())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def recipe(self, name, **fields):
+        return {'name': name, 'text': 'text', 'cooking_time': 10,
+                'image': IMAGE, 'tags': [self.tag.id],
+                'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+                **fields}
+
+    def post(self, data, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.auth_client_1.post(BATCH_URL, data, **kwargs)
+
+    def test_json_array_import(self):
+        # Arrange
+        payload = [
+            self.recipe('first'),
+            self.recipe('second', tags=[9999]),
+            self.recipe('first'),
+            'not a recipe',
+            self.recipe('third', image='not an image'),
+        ]
+        # Act
+        response = self.post(payload, format='json')
+        # Assert
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual([item['status'] for item in data['results']],
+                         [201, 400, 400, 400, 400])
+        self.assertEqual((data['created'], data['failed']), (1, 4))
+        self.assertIn('tags', data['results'][1]['errors'])
+        self.assertIn('name', data['results'][2]['errors'])
+        self.assertIn('image', data['results'][4]['errors'])
+        recipe = Recipe.objects.get(id=data['results'][0]['id'])
+        self.assertEqual(recipe.author, self.user_authenticated_1)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(recipe.ingredient_recipes.get().amount, 5)
+        self.assertTrue(recipe.image.name.startswith('recipes_images/'),
+                        'Image should be saved after the response')
+        self.assertEqual(os.path.dirname(recipe.image.path),
+                         os.path.join(settings.MEDIA_ROOT, 'recipes_images'))
+        self.assertNotEqual(settings.MEDIA_ROOT, 'media',
+                            'Images should go to the test MEDIA_ROOT')
+
+    def test_broken_base64_is_an_item_error(self):
+        # Arrange
+        payload = [
+            self.recipe('broken', image='data:image/png;base64,abc'),
+            self.recipe('valid'),
+        ]
+        # Act
+        response = self.post(payload, format='json')
+        # Assert
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual([item['status'] for item in results], [400, 201])
+        self.assertIn('image', results[0]['errors'])
+        self.assertTrue(Recipe.objects.get(name='valid').image)
+
+    def test_bad_image_does_not_stop_the_others(self):
+        # Arrange
+        first, second = (
+            Recipe.objects.create(author=self.user_authenticated_1,
+                                  name=name, text='text', cooking_time=10)
+            for name in ('first', 'second')
+        )
+        # Act
+        images.save_recipe_images({
+            first.id: 'data:image/png;base64,abc',
+            second.id: IMAGE,
+        })
+        # Assert
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertFalse(first.image)
+        self.assertTrue(second.image.name.startswith('recipes_images/'))
+
+    def test_ndjson_stream_import(self):
+        # Arrange
+        lines = [json.dumps(self.recipe(f'recipe {i}')) for i in range(3)]
+        lines.insert(1, '{broken')
+        # Act
+        response = self.post('\n'.join(lines),
+                             content_type='application/x-ndjson')
+        # Assert
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [item['status'] for item in response.json()['results']],
+            [201, 400, 201, 201]
+        )
+        self.assertEqual(Recipe.objects.count(), 3)
+
+    def test_bad_requests(self):
+        test_cases = [
+            (self.auth_client_1, {'name': 'single'}, 400),
+            (self.unauth_client, [self.recipe('anonymous')], 401),
+        ]
+        for client, payload, expected_status in test_cases:
+            with self.subTest(payload=payload):
+                response = client.post(BATCH_URL, payload, format='json')
+                self.assertEqual(response.status_code, expected_status)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_scalar_bodies_are_rejected(self):
+        for body in ('5', 'null', 'true', '"recipes"'):
+            with self.subTest(body=body):
+                # Act
+                response = self.auth_client_1.post(
+                    BATCH_URL, body, content_type='application/json')
+                # Assert
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
@@ -0,0 +1,73 @@
+from recipes.models import Ingredient, IngredientPerRecipe, Recipe, Tag
+from tests.base_test import BaseTestCase
+
+
+class RecipeFragmentCacheTestCase(BaseTestCase):
+    '''Cached recipe payload must follow every write that changes it.'''
+
+    def setUp(self):
+        self.tag = Tag.objects.create(name='breakfast', slug='breakfast')
+        self.ingredient = Ingredient.objects.create(name='carrot',
+                                                    measurement_unit='g')
+        self.recipe = Recipe.objects.create(author=self.user_authenticated_1,
+                                            name='recipe1', text='text',
+                                            cooking_time=10)
+        self.recipe.tags.add(self.tag)
+        IngredientPerRecipe.objects.create(recipe=self.recipe,
+                                           ingredient=self.ingredient,
+                                           amount=10)
+        self.url = f'/api/recipes/{self.recipe.id}/'
+        # Warm up the cache.
+        self.client.get(self.url)
+        self.client.get('/api/recipes/')
+
+    def get_recipe(self):
+        detail = self.client.get(self.url).json()
+        listed = self.client.get('/api/recipes/').json()['results'][0]
+        self.assertEqual(detail, listed,
+                         'List and detail should show the same recipe')
+        return detail
+
+    def rename_tag(self):
+        self.tag.name = 'renamed'
+        self.tag.save()
+
+    def rename_author(self):
+        self.user_authenticated_1.first_name = 'renamed'
+        self.user_authenticated_1.save()
+
+    def test_cached_recipe_is_invalidated_by_writes(self):
+        # Arrange
+        other_tag = Tag.objects.create(name='dinner', slug='dinner')
+        test_cases = [
+            ('recipe tags added', lambda: self.recipe.tags.add(other_tag),
+             lambda data: self.assertEqual(len(data['tags']), 2)),
+            ('tag renamed', self.rename_tag,
+             lambda data: self.assertIn(
+                 'renamed', [tag['name'] for tag in data['tags']])),
+            ('ingredient removed',
+             lambda: IngredientPerRecipe.objects.get(
+                 recipe=self.recipe).delete(),
+             lambda data: self.assertEqual(data['ingredients'], [])),
+            ('author renamed', self.rename_author,
+             lambda data: self.assertEqual(data['author']['first_name'],
+                                           'renamed')),
+            ('tag deleted', other_tag.delete,
+             lambda data: self.assertEqual(len(data['tags']), 1)),
+        ]
+
+        # Act & Assert
+        for write_name, write, check in test_cases:
+            with self.subTest(write=write_name):
+                write()
+                check(self.get_recipe())
+
+    def test_cached_recipe_keeps_user_flags_fresh(self):
+        # Act
+        self.auth_client_1.get(self.url)
+        self.auth_client_1.post(f'{self.url}favorite/')
+        response = self.auth_client_1.get(self.url)
+
+        # Assert
+        self.assertTrue(response.json()['is_favorited'],
+                        'Favorite flag should not be cached')
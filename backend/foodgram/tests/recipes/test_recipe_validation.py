@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import catalogue
+from recipes.models import Ingredient, Recipe, Tag
+from tests.base_test import BaseTestCase
+
+IMAGE = ('data:image/png;base64,'
+         'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/'
+         'S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAA'
+         'BJRU5ErkJggg==')
+
+
+class RecipeValidationTestCase(BaseTestCase):
+    '''Tags and ingredients are validated together with per-item errors.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tags = Tag.objects.bulk_create(
+            [Tag(name=f'tag{i}', slug=f'tag{i}') for i in range(2)]
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(name=f'ingredient{i}', measurement_unit='g')
+             for i in range(30)]
+        )
+
+    def payload(self, tags, ingredients):
+        return {'tags': tags, 'ingredients': ingredients, 'name': 'recipe',
+                'text': 'text', 'cooking_time': 10, 'image': IMAGE}
+
+    def post(self, tags, ingredients):
+        return self.auth_client_1.post(
+            '/api/recipes/', self.payload(tags, ingredients), format='json'
+        )
+
+    def test_errors_point_to_items(self):
+        # Arrange
+        tag = self.tags[0].id
+        ingredient = self.ingredients[0].id
+        test_cases = [
+            ('unknown tag', [tag, 9999],
+             [{'id': ingredient, 'amount': 1}],
+             {'tags': {'1': ['Указан не существующий тег']}}),
+            ('duplicate tag', [tag, tag],
+             [{'id': ingredient, 'amount': 1}],
+             {'tags': {'1': ['Теги не должны повторяться']}}),
+            ('unknown and duplicate ingredients', [tag],
+             [{'id': ingredient, 'amount': 1},
+              {'id': 9999, 'amount': 1},
+              {'id': ingredient, 'amount': 2}],
+             {'ingredients': [
+                 {},
+                 {'id': ['Указан не существующий ингридиент']},
+                 {'id': ['Ингридиенты должны быть уникальными']}]}),
+            ('bad amounts', [tag],
+             [{'id': ingredient, 'amount': 0},
+              {'id': self.ingredients[1].id, 'amount': 'много'}],
+             {'ingredients': [
+                 {'amount': ['Убедитесь, что значение количества '
+                             'ингредиента в рецепте от 1 до 10000']},
+                 {'amount': ['Количество должно быть числом']}]}),
+        ]
+        # Act & Assert
+        for case, tags, ingredients, expected in test_cases:
+            with self.subTest(case=case):
+                response = self.post(tags, ingredients)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), expected)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_validation_query_count_does_not_grow(self):
+        # Arrange
+        tag_ids = [tag.id for tag in self.tags]
+        counts = []
+        catalogue.tags.get(0)
+        catalogue.ingredients.get(0)
+        # Act
+        for size in (1, 30):
+            ingredients = [{'id': ingredient.id, 'amount': 9999}
+                           for ingredient in self.ingredients[:size]]
+            with CaptureQueriesContext(connection) as context:
+                # Unknown tag: the payload fails after full validation.
+                response = self.post(tag_ids + [9999], ingredients)
+            self.assertEqual(response.status_code, 400)
+            counts.append(len(context.captured_queries))
+        # Assert
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from recipes.models import Ingredient, IngredientPerRecipe, Recipe, Tag
+from tests.base_test import BaseTestCase
+from tests.recipes.test_recipe_validation import IMAGE
+
+
+class RecipeWriteTestCase(BaseTestCase):
+    '''Recipe writes are atomic and touch only the rows that changed.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tags = Tag.objects.bulk_create(
+            [Tag(name=f'tag{i}', slug=f'tag{i}') for i in range(3)]
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(name=f'ingredient{i}', measurement_unit='g')
+             for i in range(4)]
+        )
+
+    def payload(self, tags, amounts):
+        return {
+            'tags': [self.tags[number].id for number in tags],
+            'ingredients': [
+                {'id': self.ingredients[number].id, 'amount': amount}
+                for number, amount in amounts.items()
+            ],
+            'name': 'recipe', 'text': 'text', 'cooking_time': 10,
+            'image': IMAGE,
+        }
+
+    def create_recipe(self):
+        response = self.auth_client_1.post(
+            '/api/recipes/', self.payload([0, 1], {0: 10, 1: 20, 2: 30}),
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Recipe.objects.get(id=response.json()['id'])
+
+    def test_update_changes_only_differing_rows(self):
+        # Arrange
+        recipe = self.create_recipe()
+        rows_before = {row.ingredient_id: row.id
+                       for row in recipe.ingredient_recipes.all()}
+        # Act
+        response = self.auth_client_1.patch(
+            f'/api/recipes/{recipe.id}/',
+            self.payload([1, 2], {0: 10, 1: 25, 3: 40}), format='json'
+        )
+        # Assert
+        self.assertEqual(response.status_code, 200, response.content)
+        rows = {row.ingredient_id: row
+                for row in recipe.ingredient_recipes.all()}
+        first, second, _, fourth = self.ingredients
+        self.assertEqual({key: row.amount for key, row in rows.items()},
+                         {first.id: 10, second.id: 25, fourth.id: 40})
+        for ingredient in (first, second):
+            with self.subTest(ingredient=ingredient.name):
+                self.assertEqual(rows[ingredient.id].id,
+                                 rows_before[ingredient.id],
+                                 'Kept rows should not be re-inserted')
+        self.assertEqual(
+            sorted(tag['id'] for tag in response.json()['tags']),
+            [self.tags[1].id, self.tags[2].id]
+        )
+
+    def test_create_is_atomic(self):
+        # Arrange
+        failing_insert = mock.patch.object(
+            IngredientPerRecipe.objects, 'bulk_create',
+            side_effect=DatabaseError('insert failed')
+        )
+        # Act
+        with failing_insert, self.assertRaises(DatabaseError):
+            self.auth_client_1.post(
+                '/api/recipes/', self.payload([0], {0: 10}), format='json'
+            )
+        # Assert
+        self.assertFalse(Recipe.objects.exists(),
+                         'Recipe without ingredients should not be saved')
@@ -0,0 +1,76 @@
+from django.utils import timezone
+from recipes.models import Recipe
+from tests.base_test import BaseTestCase
+
+
+class RecipeCursorPaginationTestCase(BaseTestCase):
+    URL = '/api/recipes/?cursor=&limit=3'
+
+    def setUp(self):
+        for number in range(7):
+            Recipe.objects.create(author=self.user_authenticated_1,
+                                  name=f'recipe{number}', text='text',
+                                  cooking_time=10)
+        # Some recipes share pub_date, so ties must be broken by id.
+        Recipe.objects.filter(name__in=('recipe2', 'recipe3', 'recipe4')
+                              ).update(pub_date=timezone.now())
+        self.expected_ids = list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.json())
+            ids += [recipe['id'] for recipe in response.json()['results']]
+            url = response.json()[link]
+        return ids
+
+    def test_cursor_walks_whole_feed_without_duplicates(self):
+        ids = self.walk(self.URL, 'next')
+
+        self.assertEqual(ids, self.expected_ids,
+                         'Cursor pages should follow (-pub_date, -id)')
+
+    def test_previous_cursor_returns_to_first_page(self):
+        # Arrange
+        first_page = self.client.get(self.URL).json()
+        second_page = self.client.get(first_page['next']).json()
+
+        # Act
+        previous_page = self.client.get(second_page['previous']).json()
+
+        # Assert
+        self.assertEqual(previous_page['results'], first_page['results'])
+        self.assertIsNone(previous_page['previous'])
+
+    def test_new_recipe_does_not_shift_next_page(self):
+        # Arrange
+        first_page = self.client.get(self.URL).json()
+
+        # Act
+        Recipe.objects.create(author=self.user_authenticated_1,
+                              name='fresh', text='text', cooking_time=10)
+        second_page = self.client.get(first_page['next']).json()
+
+        # Assert
+        self.assertEqual([recipe['id'] for recipe in second_page['results']],
+                         self.expected_ids[3:6])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?cursor=garbage')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/recipes/?limit=3')
+
+        self.assertEqual(response.json()['count'], 7,
+                         'Page number pagination should stay available')
+
+    def test_author_recipes_cursor(self):
+        url = (f'/api/users/{self.user_authenticated_1.id}/recepies/'
+               '?cursor=&limit=2')
+
+        self.assertEqual(self.walk(url, 'next'), self.expected_ids)
@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe, Tag
+from tests.base_test import BaseTestCase
+
+
+class RecipeTagFilterTestCase(BaseTestCase):
+    '''Filtering by several tags returns every matching recipe once.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tags = Tag.objects.bulk_create(
+            [Tag(name=slug, slug=slug) for slug in ('tag1', 'tag10', 'tag2')]
+        )
+        cls.recipes = {}
+        for name, tag_slugs in (('both', ('tag1', 'tag2')),
+                                ('first', ('tag1',)),
+                                ('prefixed', ('tag10',)),
+                                ('none', ())):
+            recipe = Recipe.objects.create(author=cls.user_authenticated_1,
+                                           name=name, text='text',
+                                           cooking_time=10)
+            recipe.tags.set([tag for tag in cls.tags
+                             if tag.slug in tag_slugs])
+            cls.recipes[name] = recipe
+
+    def test_filter_by_tags(self):
+        # Arrange
+        test_cases = [
+            ('tags=tag1', {'both', 'first'}),
+            ('tags=tag1&tags=tag2', {'both', 'first'}),
+            ('tags=tag10', {'prefixed'}),
+            ('tags=tag1&tags=tag2&tags=tag10', {'both', 'first', 'prefixed'}),
+            ('', {'both', 'first', 'prefixed', 'none'}),
+        ]
+        # Act & Assert
+        for query, expected in test_cases:
+            with self.subTest(query=query):
+                data = self.client.get(f'/api/recipes/?{query}').json()
+                names = [recipe['name'] for recipe in data['results']]
+                self.assertEqual(len(names), len(set(names)),
+                                 'Recipe should be listed only once')
+                self.assertEqual(set(names), expected)
+                self.assertEqual(data['count'], len(expected))
+
+    def test_unknown_tag_is_rejected(self):
+        response = self.client.get('/api/recipes/?tags=unknown')
+        self.assertEqual(response.status_code, 400)
+
+    def test_filter_does_not_join_tags(self):
+        # Act
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/recipes/?tags=tag1&tags=tag2')
+        # Assert
+        page_query = next(query['sql'] for query in context.captured_queries
+                          if 'COUNT' not in query['sql']
+                          and 'FROM "recipes_recipe"' in query['sql'])
+        self.assertIn('EXISTS', page_query)
+        self.assertNotIn('JOIN "recipes_recipe_tags"', page_query)
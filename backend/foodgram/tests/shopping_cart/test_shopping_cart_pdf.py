@@ -0,0 +1,69 @@
+import re
+from unittest import mock
+
+from api import utils
+from recipes.models import (Ingredient, IngredientPerRecipe, Recipe,
+                            ShopingCart)
+from tests.base_test import BaseTestCase
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartPdfTestCase(BaseTestCase):
+    INGREDIENTS_COUNT = 70
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        recipe = Recipe.objects.create(author=cls.user_authenticated_1,
+                                       name='recipe', text='text',
+                                       cooking_time=10)
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(cls.INGREDIENTS_COUNT)
+        )
+        IngredientPerRecipe.objects.bulk_create(
+            IngredientPerRecipe(recipe=recipe, ingredient=ingredient,
+                                amount=10)
+            for ingredient in ingredients
+        )
+        ShopingCart.objects.create(user=cls.user_authenticated_1,
+                                   recipe=recipe)
+
+    def download(self):
+        response = self.auth_client_1.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_long_list_is_split_into_pages(self):
+        # Act
+        response = self.download()
+
+        # Assert
+        self.assertTrue(response.streaming,
+                        'PDF should be streamed in chunks')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', content)), 3,
+                         '28 lines fit the first page and 30 the next ones')
+
+    def test_font_is_subset_and_registered_once(self):
+        # Act
+        for _ in range(2):
+            content = b''.join(self.download().streaming_content)
+
+        # Assert
+        self.assertLessEqual(utils.register_font.cache_info().misses, 1,
+                             'Font should be parsed once per process')
+        self.assertLess(len(content), 100 * 1024,
+                        'Only used glyphs of the 640 KB font are embedded')
+
+    def test_rendering_error_fails_before_the_response(self):
+        # Arrange
+        missing_font = mock.patch.object(utils, 'register_font',
+                                         side_effect=OSError('no font'))
+
+        # Act & Assert
+        with missing_font, self.assertRaises(OSError):
+            self.auth_client_1.get(URL)
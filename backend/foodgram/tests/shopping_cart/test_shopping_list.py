@@ -0,0 +1,99 @@
+import re
+
+from api.utils import create_ingredients_list
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import shopping_list
+from recipes.models import (Ingredient, IngredientPerRecipe, Recipe,
+                            ShopingCart)
+from tests.base_test import BaseTestCase
+
+UserModel = get_user_model()
+
+
+class ShoppingListAggregationTestCase(BaseTestCase):
+    '''A large cart where many recipes share a few ingredients.'''
+    RECIPES_COUNT = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        user = cls.user_authenticated_1
+        other_user = UserModel.objects.create_user(
+            username='other', password='password', first_name='other',
+            last_name='other', email='other@gmail.com')
+        cls.flour, cls.milk, cls.salt, cls.salt_spoons = (
+            Ingredient.objects.bulk_create([
+                Ingredient(name='мука', measurement_unit='г'),
+                Ingredient(name='молоко', measurement_unit='мл'),
+                Ingredient(name='соль', measurement_unit='г'),
+                Ingredient(name='соль', measurement_unit='ч. л.'),
+            ])
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=user, name=f'recipe{i}', text='text',
+                   cooking_time=10, short_link=f'list{i}')
+            for i in range(cls.RECIPES_COUNT + 1)
+        )
+        links = []
+        for number, recipe in enumerate(recipes, 1):
+            links += [
+                IngredientPerRecipe(recipe=recipe, ingredient=cls.flour,
+                                    amount=number),
+                IngredientPerRecipe(recipe=recipe, ingredient=cls.milk,
+                                    amount=100),
+                IngredientPerRecipe(recipe=recipe, ingredient=cls.salt,
+                                    amount=5),
+            ]
+        links.append(IngredientPerRecipe(recipe=recipes[0],
+                                         ingredient=cls.salt_spoons,
+                                         amount=2))
+        IngredientPerRecipe.objects.bulk_create(links)
+        # The last recipe is only in the cart of another user.
+        ShopingCart.objects.bulk_create(
+            [ShopingCart(user=user, recipe=recipe)
+             for recipe in recipes[:-1]]
+            + [ShopingCart(user=other_user, recipe=recipes[-1])]
+        )
+        # Bulk inserts skip the signals that keep the totals up to date.
+        shopping_list.rebuild()
+
+    def test_amounts_are_summed_per_ingredient_and_unit(self):
+        # Arrange
+        count = self.RECIPES_COUNT
+        expected = [
+            (self.milk.id, 'молоко', 'мл', 100 * count),
+            (self.flour.id, 'мука', 'г', count * (count + 1) // 2),
+            (self.salt.id, 'соль', 'г', 5 * count),
+            (self.salt_spoons.id, 'соль', 'ч. л.', 2),
+        ]
+
+        # Act
+        with CaptureQueriesContext(connection) as context:
+            items = create_ingredients_list(self.user_authenticated_1)
+
+        # Assert
+        self.assertEqual(
+            [(item['ingredient_id'], item['name'], item['measurement_unit'],
+              item['total_amount']) for item in items],
+            expected)
+        self.assertEqual(len(context.captured_queries), 1,
+                         'The list should be read in one query')
+
+    def test_empty_cart(self):
+        user = UserModel.objects.create_user(
+            username='empty', password='password', first_name='empty',
+            last_name='empty', email='empty@gmail.com')
+        self.assertEqual(create_ingredients_list(user), [])
+
+    def test_pdf_has_a_line_per_distinct_ingredient(self):
+        '''120 cart rows collapse into 4 lines on a single page.'''
+        # Act
+        response = self.auth_client_1.get(
+            '/api/recipes/download_shopping_cart/')
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', content)), 1)
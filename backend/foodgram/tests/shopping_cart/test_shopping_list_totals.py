@@ -0,0 +1,255 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from recipes import shopping_list
+from recipes.models import (Ingredient, IngredientPerRecipe, Recipe,
+                            ShopingCart, ShoppingListItem, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from tests.base_test import BaseTestCase
+from tests.recipes.test_recipe_validation import IMAGE
+
+UserModel = get_user_model()
+
+URL = '/api/recipes/shopping_list/'
+
+
+class ShoppingListTotalsTestCase(BaseTestCase):
+    '''Totals follow cart and recipe changes without a full recount.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tag = Tag.objects.create(name='tag', slug='tag')
+        cls.flour, cls.milk, cls.eggs = Ingredient.objects.bulk_create([
+            Ingredient(name='мука', measurement_unit='г'),
+            Ingredient(name='молоко', measurement_unit='мл'),
+            Ingredient(name='яйца', measurement_unit='шт'),
+        ])
+        cls.pancakes = cls.create_recipe('pancakes', {cls.flour: 200,
+                                                      cls.milk: 300})
+        cls.omelette = cls.create_recipe('omelette', {cls.milk: 50,
+                                                      cls.eggs: 3})
+        cls.other_user = UserModel.objects.create_user(
+            username='other', password='password', first_name='other',
+            last_name='other', email='other@gmail.com')
+        cls.other_client = APIClient()
+        cls.other_client.credentials(
+            HTTP_AUTHORIZATION='Token '
+            + Token.objects.create(user=cls.other_user).key)
+
+    @classmethod
+    def create_recipe(cls, name, amounts):
+        recipe = Recipe.objects.create(
+            author=cls.user_authenticated_1, name=name, text='text',
+            cooking_time=10, short_link=name)
+        IngredientPerRecipe.objects.bulk_create(
+            IngredientPerRecipe(recipe=recipe, ingredient=ingredient,
+                                amount=amount)
+            for ingredient, amount in amounts.items()
+        )
+        return recipe
+
+    def add_to_cart(self, client, recipe):
+        response = client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def totals(self, user=None):
+        return dict(ShoppingListItem.objects
+                    .filter(user=user or self.user_authenticated_1)
+                    .values_list('ingredient__name', 'total_amount'))
+
+    def assertMatchesRebuild(self):
+        expected = set(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount'))
+        shopping_list.rebuild()
+        self.assertEqual(
+            set(ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount')),
+            expected, 'Incremental totals should match a full rebuild')
+
+    def test_cart_additions_and_removals(self):
+        # Act & Assert
+        self.add_to_cart(self.auth_client_1, self.pancakes)
+        self.assertEqual(self.totals(), {'мука': 200, 'молоко': 300})
+
+        self.add_to_cart(self.auth_client_1, self.omelette)
+        self.assertEqual(self.totals(),
+                         {'мука': 200, 'молоко': 350, 'яйца': 3})
+
+        response = self.auth_client_1.delete(
+            f'/api/recipes/{self.pancakes.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.totals(), {'молоко': 50, 'яйца': 3},
+                         'Ingredients left at zero should be removed')
+        self.assertMatchesRebuild()
+
+    def test_changes_lock_the_user_first(self):
+        # Arrange
+        lock = mock.patch.object(shopping_list, 'lock_users',
+                                 wraps=shopping_list.lock_users)
+
+        # Act
+        with lock as lock_users:
+            self.add_to_cart(self.auth_client_1, self.pancakes)
+
+        # Assert
+        lock_users.assert_called_once_with({self.user_authenticated_1.id})
+        self.assertEqual(self.totals(), {'мука': 200, 'молоко': 300})
+
+    def test_recipe_edit_updates_every_cart(self):
+        # Arrange
+        self.add_to_cart(self.auth_client_1, self.pancakes)
+        self.add_to_cart(self.other_client, self.pancakes)
+        self.add_to_cart(self.other_client, self.omelette)
+        payload = {
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.flour.id, 'amount': 250},
+                            {'id': self.eggs.id, 'amount': 2}],
+            'name': 'pancakes', 'text': 'text', 'cooking_time': 10,
+            'image': IMAGE,
+        }
+
+        # Act
+        response = self.auth_client_1.patch(
+            f'/api/recipes/{self.pancakes.id}/', payload, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.totals(), {'мука': 250, 'яйца': 2})
+        self.assertEqual(self.totals(self.other_user),
+                         {'мука': 250, 'молоко': 50, 'яйца': 5})
+        self.assertMatchesRebuild()
+
+    def test_recipe_deletion_removes_its_ingredients(self):
+        # Arrange
+        self.add_to_cart(self.other_client, self.pancakes)
+        self.add_to_cart(self.other_client, self.omelette)
+
+        # Act
+        self.pancakes.delete()
+
+        # Assert
+        self.assertEqual(self.totals(self.other_user),
+                         {'молоко': 50, 'яйца': 3})
+        self.assertMatchesRebuild()
+
+    def test_ingredient_rows_edited_outside_the_api(self):
+        # Arrange
+        self.add_to_cart(self.auth_client_1, self.pancakes)
+        self.add_to_cart(self.other_client, self.pancakes)
+        row = self.pancakes.ingredient_recipes.get(ingredient=self.milk)
+
+        def change_amount():
+            row.amount = 100
+            row.save()
+
+        def change_ingredient():
+            row.ingredient = self.eggs
+            row.save()
+
+        test_cases = [
+            ('amount', change_amount, {'мука': 200, 'молоко': 100}),
+            ('ingredient', change_ingredient, {'мука': 200, 'яйца': 100}),
+            ('create', lambda: IngredientPerRecipe.objects.create(
+                recipe=self.pancakes, ingredient=self.milk, amount=20),
+             {'мука': 200, 'молоко': 20, 'яйца': 100}),
+            ('delete', row.delete, {'мука': 200, 'молоко': 20}),
+            ('queryset delete', lambda: IngredientPerRecipe.objects.filter(
+                recipe=self.pancakes, ingredient=self.flour).delete(),
+             {'молоко': 20}),
+        ]
+        for name, edit, expected in test_cases:
+            with self.subTest(name=name):
+                # Act
+                edit()
+                # Assert
+                self.assertEqual(self.totals(), expected)
+                self.assertEqual(self.totals(self.other_user), expected)
+                self.assertMatchesRebuild()
+
+    def test_ingredients_edited_through_the_m2m_manager(self):
+        # Arrange
+        self.add_to_cart(self.auth_client_1, self.pancakes)
+        self.add_to_cart(self.other_client, self.pancakes)
+        test_cases = [
+            ('add', lambda: self.pancakes.ingredients.add(
+                self.eggs, through_defaults={'amount': 4}),
+             {'мука': 200, 'молоко': 300, 'яйца': 4}),
+            ('remove', lambda: self.pancakes.ingredients.remove(self.milk),
+             {'мука': 200, 'яйца': 4}),
+            ('set', lambda: self.pancakes.ingredients.set(
+                [self.flour, self.milk], through_defaults={'amount': 7}),
+             {'мука': 200, 'молоко': 7}),
+            ('reverse add', lambda: self.eggs.recipe_set.add(
+                self.pancakes, through_defaults={'amount': 5}),
+             {'мука': 200, 'молоко': 7, 'яйца': 5}),
+            ('clear', self.pancakes.ingredients.clear, {}),
+        ]
+        for name, edit, expected in test_cases:
+            with self.subTest(name=name):
+                # Act
+                edit()
+                # Assert
+                self.assertEqual(self.totals(), expected)
+                self.assertEqual(self.totals(self.other_user), expected)
+                self.assertMatchesRebuild()
+
+    def test_ingredient_deletion_removes_its_rows(self):
+        # Arrange
+        self.add_to_cart(self.auth_client_1, self.pancakes)
+        self.add_to_cart(self.auth_client_1, self.omelette)
+
+        # Act
+        self.milk.delete()
+
+        # Assert
+        self.assertEqual(self.totals(), {'мука': 200, 'яйца': 3})
+        self.assertMatchesRebuild()
+
+    def test_preview(self):
+        # Arrange
+        self.add_to_cart(self.auth_client_1, self.pancakes)
+        self.add_to_cart(self.auth_client_1, self.omelette)
+        test_cases = [
+            (self.auth_client_1, 200, [
+                {'id': self.milk.id, 'name': 'молоко',
+                 'measurement_unit': 'мл', 'amount': 350},
+                {'id': self.flour.id, 'name': 'мука',
+                 'measurement_unit': 'г', 'amount': 200},
+                {'id': self.eggs.id, 'name': 'яйца',
+                 'measurement_unit': 'шт', 'amount': 3},
+            ]),
+            (self.other_client, 200, []),
+            (self.unauth_client, 401, None),
+        ]
+        for client, expected_status, expected in test_cases:
+            with self.subTest(client=client):
+                # Act
+                response = client.get(URL)
+                # Assert
+                self.assertEqual(response.status_code, expected_status)
+                if expected is not None:
+                    self.assertEqual(response.json(), expected)
+
+    def test_rebuild_command_repairs_totals(self):
+        # Arrange
+        ShopingCart.objects.bulk_create([
+            ShopingCart(user=self.other_user, recipe=self.pancakes),
+            ShopingCart(user=self.other_user, recipe=self.omelette),
+        ])
+        ShoppingListItem.objects.create(user=self.other_user,
+                                        ingredient=self.eggs,
+                                        total_amount=100)
+        output = StringIO()
+
+        # Act
+        call_command('rebuild_shopping_lists', user_ids=[self.other_user.id],
+                     stdout=output)
+
+        # Assert
+        self.assertIn('3 shopping list rows rebuilt', output.getvalue())
+        self.assertEqual(self.totals(self.other_user),
+                         {'мука': 200, 'молоко': 350, 'яйца': 3})
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from recipes.models import Recipe
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from tests.base_test import BaseTestCase
@@ -98,3 +99,91 @@ class UserSubscriptionsTestCase(BaseTestCase):
                 # Assert
                 self.assertEqual(response.status_code, expected_status,
                                  error_msg)
+
+    def test_users_list_marks_subscribed_authors(self):
+        # Arrange
+        Subscription.objects.create(user=self.user_authenticated_1,
+                                    target_user=self.user_authenticated_2)
+        expected_flags = {self.user_authenticated_1.id: False,
+                          self.user_authenticated_2.id: True}
+
+        # Act
+        response = self.auth_client_1.get('/api/users/')
+
+        # Assert
+        flags = {user['id']: user['is_subscribed']
+                 for user in response.json()['results']}
+        self.assertEqual(flags, expected_flags,
+                         'Only followed authors should be marked '
+                         'as subscribed')
+
+
+class SubscriptionsRecipesLimitTestCase(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = UserModel.objects.create_user(
+            username='author', password='password', first_name='author',
+            last_name='author', email='author@gmail.com')
+        Subscription.objects.create(user=cls.user_authenticated_1,
+                                    target_user=author)
+        cls.subscribe_url = f'/api/users/{author.id}/subscribe/'
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'recipe{i}', text='text',
+                   cooking_time=10, short_link=f'limit{i}')
+            for i in range(3)
+        )
+
+    def test_recipes_limit(self):
+        # Arrange
+        test_cases = [
+            ('', 200, 3),
+            ('?recipes_limit=2', 200, 2),
+            ('?recipes_limit=0', 200, 0),
+            ('?recipes_limit=abc', 400, None),
+            ('?recipes_limit=-1', 400, None),
+        ]
+        for query, expected_status, expected_count in test_cases:
+            with self.subTest(query=query):
+                # Act
+                response = self.auth_client_1.get(
+                    f'/api/users/subscriptions/{query}')
+                # Assert
+                self.assertEqual(response.status_code, expected_status)
+                if expected_count is not None:
+                    self.assertEqual(
+                        len(response.data['results'][0]['recipes']),
+                        expected_count)
+                else:
+                    self.assertIn('recipes_limit', response.data)
+
+    def test_subscriptions_are_paginated(self):
+        # Arrange
+        expected_keys = {'count', 'next', 'previous', 'results'}
+
+        # Act
+        response = self.auth_client_1.get(
+            '/api/users/subscriptions/?limit=1&page=1')
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(expected_keys <= set(response.data),
+                        'Subscriptions should use the paginated envelope '
+                        'documented in the API schema')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['recipes_count'], 3)
+
+    def test_recipes_limit_on_subscribe(self):
+        # Arrange
+        Subscription.objects.all().delete()
+
+        # Act
+        response = self.auth_client_1.post(
+            f'{self.subscribe_url}?recipes_limit=abc')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.data)
+        self.assertFalse(Subscription.objects.exists(),
+                         'Subscription should not be created')
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_subscription_user_target_user_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['target_user', 'user'], name='subscription_target_user_idx'),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='target_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subscribers', to=settings.AUTH_USER_MODEL, verbose_name='Подписки'),
+        ),
+    ]
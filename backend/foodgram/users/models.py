@@ -83,7 +83,9 @@ class Subscription(models.Model):
         to=CustomUser,
         on_delete=models.CASCADE,
         blank=False,
-        related_name='subscribers'
+        related_name='subscribers',
+        # Покрыт индексом subscription_target_user_idx.
+        db_index=False,
     )
 
     class Meta:
@@ -91,3 +93,9 @@ class Subscription(models.Model):
             models.UniqueConstraint(fields=['user', 'target_user'],
                                     name='user_target_user_unique',)
         ]
+        indexes = [
+            # Подписчики автора: проверка подписки с его стороны и
+            # удаление автора.
+            models.Index(fields=['target_user', 'user'],
+                         name='subscription_target_user_idx'),
+        ]